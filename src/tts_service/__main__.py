@@ -61,4 +61,14 @@ if __name__ == "__main__":
     # Validar dependencias críticas
     validate_dependencies()
 
-    uvicorn.run("tts_service.api:app", host=settings.HOST, port=settings.PORT, reload=True)
\ No newline at end of file
+    # uvloop (libuv) + httptools (parser C) en vez del selector loop y h11
+    # puros-Python; reload solo en desarrollo para no arrancar watchfiles
+    uvicorn.run(
+        "tts_service.api:app",
+        host=settings.HOST,
+        port=settings.PORT,
+        loop="uvloop",
+        http="httptools",
+        workers=settings.WORKERS,
+        reload=settings.DEV_RELOAD
+    )
\ No newline at end of file
@@ -1,23 +1,39 @@
+import asyncio
+import functools
+import hashlib
+import hmac
 import io
 import json
+import os
+import pickle
+import secrets
+import struct
+import sys
 import time
-import uuid
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Any, Dict, Optional
 from fastapi import FastAPI, Security, HTTPException, status, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from fastapi.security.api_key import APIKeyHeader
-from pydantic import BaseModel, Field
-from pydub import AudioSegment
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 
-from tts_service.engines.piper import PiperEngine  # ensure registration
-from tts_service.engines.coqui import CoquiEngine  # ensure registration
-from tts_service.engines.base import get_engine
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
+    ORJSONResponse = None  # type: ignore
+
+from tts_service.engines.base import EngineRegistry, get_engine
 from tts_service.utils import cache
-from tts_service.utils.prosody import apply_prosody
+from tts_service.utils.batcher import batcher
+from tts_service.utils.audio import write_wav_pcm16
+from tts_service.utils.prosody import apply_prosody, apply_prosody_array
 from tts_service.utils.text_norm import normalize_numbers_es
-from tts_service.utils.emotions import resolve_emotion
+from tts_service.utils.emotions import build_emotion_map
 from tts_service.utils.logging import get_logger, log_api_request, log_error_with_context
 from tts_service.utils.dependencies import dependency_manager
 from .config import settings
@@ -26,7 +42,11 @@ from .config import settings
 
 app = FastAPI(
     title=settings.APP_NAME,
-    version=settings.API_VERSION
+    version=settings.API_VERSION,
+    openapi_url="/openapi.json" if settings.ENABLE_DOCS else None,
+    docs_url="/docs" if settings.ENABLE_DOCS else None,
+    redoc_url=None,
+    **({"default_response_class": ORJSONResponse} if ORJSONResponse else {})
 )
 
 app.add_middleware(
@@ -45,22 +65,30 @@ _UNIFIED_JSON = settings.get_unified_config_path()
 # Logger para API
 logger = get_logger("tts_service.api")
 
+def _json_loads_file(path: Path) -> Dict[str, Any]:
+    """Parsea un JSON de config; usa orjson (C+SIMD) si está disponible."""
+    data = path.read_bytes()
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
 def _load_config() -> Dict[str, Any]:
     unified: Dict[str, Any] = {}
     if _UNIFIED_JSON.exists():
-        with _UNIFIED_JSON.open("r", encoding="utf-8") as f:
-            unified = json.load(f)
+        unified = _json_loads_file(_UNIFIED_JSON)
     voices: list[Dict[str, Any]] = []
     if unified.get("voices"):
         voices.extend(unified["voices"])
     elif _VOICES_JSON.exists():  # legacy fallback
-        with _VOICES_JSON.open("r", encoding="utf-8") as f:
-            legacy = json.load(f)
-            voices.extend(legacy.get("voices", []))
-    # extra coqui models
+        legacy = _json_loads_file(_VOICES_JSON)
+        voices.extend(legacy.get("voices", []))
+    # extra coqui models (set para dedup O(N) en vez del any() cuadrático)
     coqui_cfg = unified.get("coqui", {})
+    seen_models = {v.get("model") for v in voices if v.get("model")}
     for m in coqui_cfg.get("extra_models", []) or []:
-        if not any(v.get("model") == m for v in voices):
+        if m not in seen_models:
+            seen_models.add(m)
             vid = m.replace("/", "-")
             voices.append({
                 "id": f"coqui-{vid}",
@@ -78,48 +106,142 @@ def _load_config() -> Dict[str, Any]:
         "prosody_presets": unified.get("prosody_presets", {})
     }
 
-CONFIG = _load_config()
+
+def _config_cache_key() -> str:
+    """Clave de cache derivada de (path, size, mtime) de los JSON de config."""
+    parts = []
+    for p in (_UNIFIED_JSON, _VOICES_JSON):
+        try:
+            st = p.stat()
+            parts.append(f"{p}|{st.st_size}|{st.st_mtime_ns}")
+        except OSError:
+            parts.append(f"{p}|missing")
+    return hashlib.sha256("||".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+# Memo en proceso: (clave size+mtime, config). Re-llamadas sin cambios en
+# los JSON ni tocan disco.
+_CONFIG_MEMO: Optional[tuple] = None
+
+
+def _load_config_cached() -> Dict[str, Any]:
+    """Como `_load_config` pero con memo en proceso y cache pickle en disco.
+
+    Bajo `uvicorn --reload` el parseo JSON + merge corre en cada arranque;
+    un pickle ya normalizado se carga mucho más rápido. La clave incluye
+    size+mtime de ambos ficheros, así que cualquier edición invalida el cache.
+    """
+    global _CONFIG_MEMO
+    key = _config_cache_key()
+    if _CONFIG_MEMO is not None and _CONFIG_MEMO[0] == key:
+        return _CONFIG_MEMO[1]
+    cache_dir = Path.home() / ".cache" / "tts_service"
+    cache_file = cache_dir / f"config-{key}.pkl"
+    if cache_file.exists():
+        try:
+            with cache_file.open("rb") as f:
+                cfg = pickle.load(f)
+            _CONFIG_MEMO = (key, cfg)
+            return cfg
+        except Exception:
+            pass  # pickle corrupto o incompatible: re-parsear
+    cfg = _load_config()
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = cache_file.with_suffix(".tmp")
+        with tmp.open("wb") as f:
+            pickle.dump(cfg, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache_file)
+    except OSError:
+        pass  # cache es best-effort; sin él solo se pierde el warm start
+    _CONFIG_MEMO = (key, cfg)
+    return cfg
+
+
+CONFIG = _load_config_cached()
 VOICE_INDEX: Dict[str, Any] = {"voices": CONFIG["voices"]}
 EMOTIONS_INDEX: Dict[str, Any] = CONFIG.get("emotions", {})
 DEFAULTS_CFG: Dict[str, Any] = CONFIG.get("defaults", {})
 
+# Paralelismo piper: la vía in-process tolera síntesis concurrente (solo la
+# fonemización se serializa), así que el batcher puede usar varios workers
+_PIPER_WORKERS: int = settings.PIPER_POOL_SIZE or max(1, (os.cpu_count() or 2) // 2)
+
+# Constantes del hot path: evita repetir .get() sobre DEFAULTS_CFG por request
+_ENABLE_PROSODY: bool = bool(DEFAULTS_CFG.get("enable_prosody", True))
+_SR_DEFAULT: int = int(DEFAULTS_CFG.get("sample_rate", 22050))
+_VALID_FMTS = frozenset(("wav", "mp3", "ogg"))
+
+# /voices es estático por proceso: serializado una vez, servido como bytes
+_VOICES_BYTES: bytes = (
+    orjson.dumps(VOICE_INDEX) if orjson is not None
+    else json.dumps(VOICE_INDEX).encode("utf-8")
+)
+_VOICES_ETAG: str = f'"{hashlib.blake2b(_VOICES_BYTES, digest_size=8).hexdigest()}"'
+
+# Índices precalculados para lookup O(1) en el hot path (se construyen una vez al importar)
+VOICE_BY_ID: Dict[str, Dict[str, Any]] = {
+    v["id"]: v for v in CONFIG["voices"] if v.get("id")
+}
+PIPER_FALLBACK_BY_LANG: Dict[str, Dict[str, Any]] = {}
+for _v in CONFIG["voices"]:
+    if _v.get("provider") == "piper" and _v.get("lang"):
+        PIPER_FALLBACK_BY_LANG.setdefault(_v["lang"], _v)
+
+# Presets de emoción: defaults + JSON fusionados una vez en un solo dict
+# (claves en minúsculas), así resolver es un único .get por request
+_EMOTION_MAP: Dict[str, tuple] = build_emotion_map({
+    k: (float(v[0]), float(v[1]), float(v[2]))
+    for k, v in EMOTIONS_INDEX.items()
+    if isinstance(v, (list, tuple)) and len(v) == 3
+})
+
 def _get_voice(voice_id: str) -> Optional[Dict[str, Any]]:
-    for v in VOICE_INDEX.get("voices", []):
-        if v.get("id") == voice_id:
-            return v
-    return None
+    return VOICE_BY_ID.get(voice_id)
 
 def _find_fallback_voice(lang: str) -> Optional[Dict[str, Any]]:
-    for v in VOICE_INDEX.get("voices", []):
-        if v.get("provider") == "piper" and v.get("lang") == lang:
-            return v
-    return None
+    return PIPER_FALLBACK_BY_LANG.get(lang)
+
+# Comparación en bytes: compare_digest lanza TypeError con str no-ASCII
+# (un header arbitrario llega con surrogates), y eso convertía una key
+# inválida en un 500 en vez de 401
+_API_KEY_BYTES = settings.API_KEY.encode("utf-8")
+
 
-def require_api_key(api_key: str = Security(api_key_header)):
-    if not api_key or api_key != settings.API_KEY:
+async def require_api_key(api_key: str = Security(api_key_header)):
+    # async def evita el salto al threadpool de FastAPI por request;
+    # compare_digest cierra el side-channel de timing en la comparación
+    if not api_key or not hmac.compare_digest(
+            api_key.encode("utf-8", "surrogateescape"), _API_KEY_BYTES):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or missing API Key")
     return api_key
 
 
 @app.get("/health")
-def health():
+async def health():
     logger.debug("Health check requested")
     return { "status": "ok" }
 
 @app.get("/voices")
-def voices(api_key: str = Security(require_api_key)):
-    request_id = str(uuid.uuid4())[:8]
+async def voices(request: Request, api_key: str = Security(require_api_key)):
+    request_id = secrets.token_hex(4)
     log_api_request(logger, "/voices", request_id)
 
+    if request.headers.get("if-none-match") == _VOICES_ETAG:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED,
+                        headers={"ETag": _VOICES_ETAG})
+
     logger.info(f"Returning {len(VOICE_INDEX.get('voices', []))} available voices",
                 extra={"request_id": request_id})
-    return VOICE_INDEX
+    return Response(content=_VOICES_BYTES, media_type="application/json",
+                    headers={"ETag": _VOICES_ETAG,
+                             "Cache-Control": "public, max-age=300"})
 
 
 @app.get("/dependencies")
 def get_dependencies_status(api_key: str = Security(require_api_key)):
     """Endpoint para verificar el estado de las dependencias del sistema."""
-    request_id = str(uuid.uuid4())[:8]
+    request_id = secrets.token_hex(4)
     log_api_request(logger, "/dependencies", request_id)
 
     # Validar todas las dependencias
@@ -150,6 +272,10 @@ def get_dependencies_status(api_key: str = Security(require_api_key)):
     return response
     
 class SynthesizeRequest(BaseModel):
+    # extra="forbid" evita el walk de campos desconocidos en cada validación;
+    # frozen=True porque el handler ya no muta el modelo (usa locales)
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
     text: str = Field(..., min_length=1)
     voice: Optional[str] = Field(None, description="ID de voz (de /voices)")
     format: str = Field("wav", description=".wav / mp3 / ogg format")
@@ -165,13 +291,145 @@ class SynthesizeRequest(BaseModel):
         None,
         description="Emoción: neutral|happy|sad|angry|calm o personalizada en EMOTION_PRESETS"
     )
-    
+
+    @field_validator("voice", "format", "emotion")
+    @classmethod
+    def _intern_ids(cls, v: Optional[str]) -> Optional[str]:
+        # sys.intern en la frontera: los mismos valores repetidos entre
+        # requests comparten objeto, así los dict lookups (índice de voces,
+        # presets) y el lru_cache de make_key comparan por identidad
+        return sys.intern(v) if isinstance(v, str) else v
+
+
+
+# Coalescer "singleflight": N peticiones idénticas en vuelo comparten una
+# sola síntesis en vez de quemar CPU/GPU N veces antes de poblar el cache
+_INFLIGHT: Dict[str, "asyncio.Task[bytes]"] = {}
+_INFLIGHT_LOCK = asyncio.Lock()
+
+# Pool de procesos para post-proceso CPU-bound (prosodia, transcode):
+# evita contención de GIL con la inferencia; se crea al primer uso
+_CPU_POOL: Optional[ProcessPoolExecutor] = None
+
+
+def _get_cpu_pool() -> ProcessPoolExecutor:
+    global _CPU_POOL
+    if _CPU_POOL is None:
+        _CPU_POOL = ProcessPoolExecutor(max_workers=os.cpu_count())
+    return _CPU_POOL
+
+
+def _transcode_wav(wav_bytes: bytes, fmt: str) -> bytes:
+    """Convierte WAV a mp3/ogg con encoders in-process.
+
+    libsndfile (ogg) y LAME (mp3) corren inline, sin el fork+exec de ffmpeg
+    que pydub lanza por cada clip. pydub queda como fallback si faltan.
+    """
+    soundfile = dependency_manager.get_optional_dependency("soundfile")
+    if fmt == "ogg" and soundfile is not None:
+        data, sr = soundfile.read(io.BytesIO(wav_bytes))
+        buf = io.BytesIO()
+        soundfile.write(buf, data, sr, format="OGG", subtype="VORBIS")
+        return buf.getvalue()
+    if fmt == "mp3" and soundfile is not None:
+        lameenc = dependency_manager.get_optional_dependency("lameenc")
+        if lameenc is not None:
+            data, sr = soundfile.read(io.BytesIO(wav_bytes), dtype="int16")
+            channels = data.shape[1] if data.ndim > 1 else 1
+            enc = lameenc.Encoder()
+            enc.set_bit_rate(128)
+            enc.set_in_sample_rate(sr)
+            enc.set_channels(channels)
+            enc.set_quality(2)
+            return bytes(enc.encode(data.tobytes()) + enc.flush())
+    # Fallback: pydub (import diferido, sondea ffmpeg al importar)
+    from pydub import AudioSegment
+    audio = AudioSegment.from_file(io.BytesIO(wav_bytes), format="wav")
+    out_buf = io.BytesIO()
+    audio.export(out_buf, format=fmt)
+    return out_buf.getvalue()
+
+
+def _prosody_transcode(wav_bytes: bytes, fmt: str, speaking_rate: Optional[float],
+                       pitch_shift: Optional[float], energy: Optional[float]) -> bytes:
+    """Prosodia + transcode con una sola decodificación del WAV.
+
+    Encadenar apply_prosody → _transcode_wav codificaba un WAV intermedio
+    que el transcoder volvía a decodificar; aquí la prosodia corre sobre el
+    ndarray ya decodificado y el resultado va directo al encoder destino.
+    """
+    soundfile = dependency_manager.get_optional_dependency("soundfile")
+    if soundfile is None:
+        return _transcode_wav(
+            apply_prosody(wav_bytes, speaking_rate, pitch_shift, energy), fmt
+        )
+    data, sr = soundfile.read(io.BytesIO(wav_bytes), dtype="float32", always_2d=False)
+    data = apply_prosody_array(data, sr, speaking_rate, pitch_shift, energy)
+    if fmt == "ogg":
+        buf = io.BytesIO()
+        soundfile.write(buf, data, sr, format="OGG", subtype="VORBIS")
+        return buf.getvalue()
+    # mp3: el encoder LAME (o el fallback pydub) parte de PCM16; el WAV
+    # intermedio se arma con el encoder manual, sin pasar por libsndfile
+    return _transcode_wav(write_wav_pcm16(data, sr), fmt)
+
+
+@functools.lru_cache(maxsize=16)
+def _get_cached_engine(provider: str, model: Optional[str], **eng_kwargs):
+    """Instancia singleton por (provider, model, kwargs): los pesos se cargan una vez."""
+    return get_engine(provider, model, **eng_kwargs)
+
+
+def _run_engine(provider_sel: str, voice_obj: Dict[str, Any], text: str, sr: int,
+                length_scale: Optional[float], noise_scale: Optional[float],
+                noise_w: Optional[float], speaker: Optional[int | str]):
+    """Síntesis bloqueante para un provider/voz (se ejecuta en el batcher).
+
+    A nivel de módulo: definirla dentro de /synthesize creaba un objeto
+    función + celdas de closure nuevos en cada request.
+    """
+    eng_kwargs = EngineRegistry.build_kwargs(provider_sel, voice_obj, settings)
+    engine = _get_cached_engine(provider_sel, voice_obj.get("model"), **eng_kwargs)
+    return engine.synthesize_wav(
+        text=text,
+        sample_rate=sr,
+        length_scale=length_scale if provider_sel == "piper" else None,
+        noise_scale=noise_scale if provider_sel == "piper" else None,
+        noise_w=noise_w if provider_sel == "piper" else None,
+        speaker=speaker
+    )
+
+
+@app.on_event("startup")
+async def _warmup_models():
+    """Pre-carga los modelos Coqui declarados en la config.
+
+    La primera síntesis por modelo paga carga de pesos + alloc de VRAM +
+    construcción del grafo (segundos); hacerlo al arrancar lo saca del
+    camino crítico del primer request de usuario.
+    """
+    if not settings.WARMUP_ON_STARTUP:
+        return
+    for v in CONFIG["voices"]:
+        if v.get("provider") != "coqui":
+            continue
+        try:
+            # Mismos kwargs que un request real: si difieren, el lru_cache
+            # apunta a otra instancia y el warmup no calienta nada
+            eng_kwargs = EngineRegistry.build_kwargs("coqui", v, settings)
+            engine = await run_in_threadpool(
+                _get_cached_engine, "coqui", v.get("model"), **eng_kwargs
+            )
+            await run_in_threadpool(engine.synthesize_wav, ".")
+            logger.info(f"Warmed up coqui model {v.get('model')}")
+        except Exception as e:
+            logger.warning(f"Warmup failed for voice {v.get('id')}: {e}")
 
 
 @app.post("/synthesize")
-def synthesize(req: SynthesizeRequest, api_key: str = Security(require_api_key)):
+async def synthesize(req: SynthesizeRequest, api_key: str = Security(require_api_key)):
     start_time = time.time()
-    request_id = str(uuid.uuid4())[:8]
+    request_id = secrets.token_hex(4)
 
     log_api_request(
         logger, "/synthesize", request_id,
@@ -185,145 +443,293 @@ def synthesize(req: SynthesizeRequest, api_key: str = Security(require_api_key))
             {"request_id": request_id, "voice_id": req.voice}
         )
         raise HTTPException(status_code=404, detail=f"Voice not found: {req.voice}")
+    # Locales en vez de mutar el modelo Pydantic: asignar campos dispara
+    # el setter + revalidación de pydantic en cada request
+    text = req.text
     if settings.TTS_NORMALIZE_NUMBERS:
         try:
-            req.text = normalize_numbers_es(req.text)
+            text = normalize_numbers_es(text)
         except Exception:
             pass
     
     fmt = req.format.lower()
-    if fmt not in ["wav", "mp3", "ogg"]:
+    if fmt not in _VALID_FMTS:
         raise HTTPException(status_code=400, detail="Format must be wav, mp3 or ogg")
     
-    sr_default = DEFAULTS_CFG.get("sample_rate", 22050)
-    sr = req.sample_rate or voice.get("sample_rate", sr_default)
+    sr = req.sample_rate or voice.get("sample_rate", _SR_DEFAULT)
     provider = voice.get("provider", "piper")
     model = voice.get("model")
-    config_path = voice.get("config")
     # Emotion presets (unified config)
+    speaking_rate = req.speaking_rate
+    pitch_shift = req.pitch_shift
+    energy = req.energy
     if req.emotion:
-        preset = None
-        val = EMOTIONS_INDEX.get(req.emotion)
-        if isinstance(val, (list, tuple)) and len(val) == 3:
-            preset = (float(val[0]), float(val[1]), float(val[2]))
-        else:
-            preset = resolve_emotion(req.emotion, {})
+        preset = _EMOTION_MAP.get(req.emotion.lower())
         if preset:
             rate_p, pitch_p, energy_p = preset
-            if req.speaking_rate is None:
-                req.speaking_rate = rate_p
-            if req.pitch_shift is None:
-                req.pitch_shift = pitch_p
-            if req.energy is None:
-                req.energy = energy_p
-    key_v3 = cache.make_key_v3(
-        req.text, provider, model, req.voice, sr, fmt,
-        req.speaking_rate, req.pitch_shift, req.energy
-    ) if DEFAULTS_CFG.get("enable_prosody", True) else None
-    key_v2 = cache.make_key_v2(req.text, provider, model, req.voice, sr, fmt)
-
-    # Compatibilidad: buscar clave v2, luego legacy
-    cache_hit = False
-    if key_v3 and cache.exists(key_v3, fmt):
-        audio_bytes = cache.load(key_v3, fmt)
-        cache_hit = True
-        logger.info("Cache hit (v3)", extra={"request_id": request_id, "cache_key": "v3"})
-    elif cache.exists(key_v2, fmt):
-        audio_bytes = cache.load(key_v2, fmt)
-        cache_hit = True
-        logger.info("Cache hit (v2)", extra={"request_id": request_id, "cache_key": "v2"})
-    else:
-        legacy_key = cache.make_key(req.text, req.voice, sr, fmt)
-        if cache.exists(legacy_key, fmt):
-            audio_bytes = cache.load(legacy_key, fmt)
-            cache_hit = True
-            logger.info("Cache hit (legacy)", extra={"request_id": request_id, "cache_key": "legacy"})
+            if speaking_rate is None:
+                speaking_rate = rate_p
+            if pitch_shift is None:
+                pitch_shift = pitch_p
+            if energy is None:
+                energy = energy_p
+    filename = f'{req.voice}.{fmt}'
+    media_type = f"audio/{'wav' if fmt == 'wav' else fmt}"
+
+    # Claves perezosas: cada make_key_* hashea todo el texto, así que las
+    # claves v2/legacy solo se calculan si la anterior no acierta.
+    # Cache hit: FileResponse usa sendfile(2) — cero copias por memoria Python
+    cache_path: Optional[Path] = None
+    mem_hit: Optional[bytes] = None
+    hit_key: Optional[str] = None
+    key_v3: Optional[str] = None
+    key_v2: Optional[str] = None
+    if _ENABLE_PROSODY:
+        key_v3 = cache.make_key_v3(
+            text, provider, model, req.voice, sr, fmt,
+            speaking_rate, pitch_shift, energy
+        )
+        mem_hit = cache.mem_get(key_v3, fmt)
+        if mem_hit is None:
+            cache_path = cache.path_if_exists(key_v3, fmt)
+        if mem_hit is not None or cache_path is not None:
+            hit_key = key_v3
+            logger.info("Cache hit (v3)", extra={"request_id": request_id, "cache_key": "v3"})
+    if mem_hit is None and cache_path is None:
+        key_v2 = cache.make_key_v2(text, provider, model, req.voice, sr, fmt)
+        mem_hit = cache.mem_get(key_v2, fmt)
+        if mem_hit is None:
+            cache_path = cache.path_if_exists(key_v2, fmt)
+        if mem_hit is not None or cache_path is not None:
+            hit_key = key_v2
+            logger.info("Cache hit (v2)", extra={"request_id": request_id, "cache_key": "v2"})
         else:
-            # Selección engine
-            def _run(provider_sel: str, voice_obj: Dict[str, Any]):
-                eng_kwargs = {}
-                if provider_sel == "piper":
-                    eng_kwargs = {"config_path": voice_obj.get("config")}
-                elif provider_sel == "coqui":
-                    # GPU policy
-                    use_gpu = None
-                    if settings.COQUI_USE_GPU.lower() in ("true", "false"):
-                        use_gpu = settings.COQUI_USE_GPU.lower() == "true"
-                    eng_kwargs = {"use_gpu": use_gpu}
-                engine = get_engine(provider_sel, voice_obj.get("model"), **eng_kwargs)
-                return engine.synthesize_wav(
-                    text=req.text,
-                    sample_rate=sr,
-                    length_scale=req.length_scale if provider_sel == "piper" else None,
-                    noise_scale=req.noise_scale if provider_sel == "piper" else None,
-                    noise_w=req.noise_w if provider_sel == "piper" else None,
-                    speaker=req.speaker
-                )
-
-            logger.info(f"Starting synthesis with {provider} engine",
-                       extra={"request_id": request_id, "provider": provider, "voice_id": req.voice})
-
-            try:
-                wav_bytes = _run(provider, voice)
-            except Exception as e:
-                log_error_with_context(
-                    logger, e,
-                    {"request_id": request_id, "provider": provider, "voice_id": req.voice, "operation": "synthesis"}
-                )
-                if provider != "piper" and settings.ENABLE_FALLBACK:
-                    logger.warning(f"Attempting fallback to Piper after {provider} failure",
-                                 extra={"request_id": request_id, "original_provider": provider})
-                    fb = _find_fallback_voice(voice.get("lang", ""))
-                    if not fb:
-                        log_error_with_context(
-                            logger, ValueError("No fallback voice available"),
-                            {"request_id": request_id, "lang": voice.get("lang", "")}
-                        )
-                        raise HTTPException(status_code=500, detail=f"Engine {provider} fallo y no hay fallback disponible: {e}")
-                    try:
-                        wav_bytes = _run("piper", fb)
-                        logger.info("Fallback synthesis successful",
-                                  extra={"request_id": request_id, "fallback_voice": fb.get("id")})
-                    except Exception as e2:
-                        log_error_with_context(
-                            logger, e2,
-                            {"request_id": request_id, "provider": "piper", "operation": "fallback_synthesis"}
-                        )
-                        raise HTTPException(status_code=500, detail=f"Fallback Piper fallo: {e2}")
-                else:
-                    raise HTTPException(status_code=500, detail=f"Engine {provider} error: {e}")
-
-            # Prosodia post-proceso
-            if DEFAULTS_CFG.get("enable_prosody", True):
-                wav_bytes = apply_prosody(
-                    wav_bytes,
-                    req.speaking_rate,
-                    req.pitch_shift,
-                    req.energy
-                )
-            if fmt == "wav":
-                audio_bytes = wav_bytes
+            legacy_key = cache.make_key(text, req.voice, sr, fmt)
+            mem_hit = cache.mem_get(legacy_key, fmt)
+            if mem_hit is None:
+                cache_path = cache.path_if_exists(legacy_key, fmt)
+            if mem_hit is not None or cache_path is not None:
+                hit_key = legacy_key
+                logger.info("Cache hit (legacy)", extra={"request_id": request_id, "cache_key": "legacy"})
+
+    if mem_hit is not None:
+        duration = time.time() - start_time
+        logger.info(
+            "Synthesis request completed successfully",
+            extra={
+                "request_id": request_id,
+                "duration": f"{duration:.2f}s",
+                "output_size": len(mem_hit),
+                "cache_hit": True,
+                "cache_tier": "mem",
+                "format": fmt
+            }
+        )
+        return Response(content=mem_hit, media_type=media_type, headers={
+            "Content-Disposition": f'attachment; filename="{filename}"'
+        })
+
+    if cache_path is not None:
+        # Promoción a L1: tras un reinicio el proceso arranca con la memoria
+        # vacía y sin esto los hits de disco se servirían por sendfile para
+        # siempre; los clips que caben en el presupuesto del shard se leen
+        # una vez y las repeticiones salen de memoria
+        output_size = cache_path.stat().st_size
+        promoted: Optional[bytes] = None
+        if output_size <= cache.mem_entry_max_bytes():
+            promoted = cache.try_load(hit_key, fmt)
+        duration = time.time() - start_time
+        logger.info(
+            "Synthesis request completed successfully",
+            extra={
+                "request_id": request_id,
+                "duration": f"{duration:.2f}s",
+                "output_size": output_size,
+                "cache_hit": True,
+                "format": fmt
+            }
+        )
+        if promoted is not None:
+            return Response(content=promoted, media_type=media_type, headers={
+                "Content-Disposition": f'attachment; filename="{filename}"'
+            })
+        return FileResponse(cache_path, media_type=media_type, filename=filename)
+
+    logger.info("Starting synthesis with %s engine", provider,
+               extra={"request_id": request_id, "provider": provider, "voice_id": req.voice})
+
+    # Streaming real: WAV de Piper sin post-proceso puede enviarse según se
+    # genera, solapando síntesis y red y evitando bufferizar el clip entero
+    needs_prosody = _ENABLE_PROSODY and any(
+        [speaking_rate, pitch_shift, energy]
+    )
+    can_stream = fmt == "wav" and provider == "piper" and not needs_prosody
+    if can_stream:
+        engine = _get_cached_engine(provider, model, config_path=voice.get("config"))
+        # El stream sale al sample rate nativo del modelo: solo puede usarse
+        # si el rate efectivo del request (el que entra en la clave de cache)
+        # coincide con él; si no (o si el nativo es desconocido), sirve el
+        # camino bufferizado, que sí resamplea
+        can_stream = sr == engine.native_sample_rate()
+    if can_stream:
+        stream_it = engine.synthesize_wav_stream(
+            text=text,
+            length_scale=req.length_scale,
+            noise_scale=req.noise_scale,
+            noise_w=req.noise_w,
+            speaker=req.speaker
+        )
+        try:
+            # Primer chunk fuera del generador: los errores de arranque del
+            # engine aún pueden responderse como 500
+            first_chunk = await run_in_threadpool(next, stream_it)
+        except StopIteration:
+            raise HTTPException(status_code=500, detail="Engine piper no produjo audio")
+        except Exception as e:
+            log_error_with_context(
+                logger, e,
+                {"request_id": request_id, "provider": provider, "voice_id": req.voice, "operation": "synthesis_stream"}
+            )
+            raise HTTPException(status_code=500, detail=f"Engine {provider} error: {e}")
+
+        save_key = key_v3 if key_v3 else key_v2
+        _end = object()  # sentinela: StopIteration no puede cruzar un await
+
+        async def _stream():
+            # Generador async nativo: los generadores sync caen al threadpool
+            # de Starlette con un hop por chunk
+            chunks = [first_chunk]
+            yield first_chunk
+            while True:
+                chunk = await run_in_threadpool(next, stream_it, _end)
+                if chunk is _end:
+                    break
+                chunks.append(chunk)
+                yield chunk
+            audio = b"".join(chunks)
+            if audio[:4] == b"RIFF" and audio[4:8] == b"\xff\xff\xff\xff":
+                # El header de streaming lleva tamaños placeholder: antes de
+                # persistir se parchean los reales para que las réplicas
+                # desde cache sean un WAV bien formado
+                buf = bytearray(audio)
+                buf[4:8] = struct.pack("<I", len(audio) - 8)
+                buf[40:44] = struct.pack("<I", len(audio) - 44)
+                audio = bytes(buf)
+            cache.save(save_key, fmt, audio)
+            duration = time.time() - start_time
+            logger.info(
+                "Synthesis request completed successfully",
+                extra={
+                    "request_id": request_id,
+                    "duration": f"{duration:.2f}s",
+                    "output_size": len(audio),
+                    "cache_hit": False,
+                    "format": fmt,
+                    "streamed": True
+                }
+            )
+
+        return StreamingResponse(_stream(), media_type=media_type, headers={
+            "Content-Disposition": f'attachment; filename="{filename}"'
+        })
+
+    async def _produce() -> bytes:
+        try:
+            # Inferencia CPU-heavy: fuera del event loop, agrupada por modelo
+            wav_bytes = await batcher.submit(
+                f"{provider}:{model}",
+                functools.partial(_run_engine, provider, voice, text, sr,
+                                  req.length_scale, req.noise_scale, req.noise_w, req.speaker),
+                max_workers=_PIPER_WORKERS if provider == "piper" else 1
+            )
+        except Exception as e:
+            log_error_with_context(
+                logger, e,
+                {"request_id": request_id, "provider": provider, "voice_id": req.voice, "operation": "synthesis"}
+            )
+            if provider != "piper" and settings.ENABLE_FALLBACK:
+                logger.warning(f"Attempting fallback to Piper after {provider} failure",
+                             extra={"request_id": request_id, "original_provider": provider})
+                fb = _find_fallback_voice(voice.get("lang", ""))
+                if not fb:
+                    log_error_with_context(
+                        logger, ValueError("No fallback voice available"),
+                        {"request_id": request_id, "lang": voice.get("lang", "")}
+                    )
+                    raise HTTPException(status_code=500, detail=f"Engine {provider} fallo y no hay fallback disponible: {e}")
+                try:
+                    wav_bytes = await batcher.submit(
+                        f"piper:{fb.get('model')}",
+                        functools.partial(_run_engine, "piper", fb, text, sr,
+                                          req.length_scale, req.noise_scale, req.noise_w, req.speaker),
+                        max_workers=_PIPER_WORKERS
+                    )
+                    logger.info("Fallback synthesis successful",
+                              extra={"request_id": request_id, "fallback_voice": fb.get("id")})
+                except Exception as e2:
+                    log_error_with_context(
+                        logger, e2,
+                        {"request_id": request_id, "provider": "piper", "operation": "fallback_synthesis"}
+                    )
+                    raise HTTPException(status_code=500, detail=f"Fallback Piper fallo: {e2}")
             else:
-                audio = AudioSegment.from_file(io.BytesIO(wav_bytes), format="wav")
-                out_buf = io.BytesIO()
-                audio.export(out_buf, format=fmt)
-                audio_bytes = out_buf.getvalue()
-            cache.save(key_v3 if key_v3 else key_v2, fmt, audio_bytes)
+                raise HTTPException(status_code=500, detail=f"Engine {provider} error: {e}")
+
+        # Prosodia post-proceso y transcode: CPU-bound, fuera del event loop
+        # y del GIL (pool de procesos)
+        loop = asyncio.get_running_loop()
+        if needs_prosody and fmt != "wav":
+            audio_bytes = await loop.run_in_executor(
+                _get_cpu_pool(), _prosody_transcode, wav_bytes,
+                fmt, speaking_rate, pitch_shift, energy
+            )
+        elif needs_prosody:
+            audio_bytes = await loop.run_in_executor(
+                _get_cpu_pool(), apply_prosody, wav_bytes, speaking_rate, pitch_shift, energy
+            )
+        elif fmt != "wav":
+            audio_bytes = await loop.run_in_executor(_get_cpu_pool(), _transcode_wav, wav_bytes, fmt)
+        else:
+            audio_bytes = wav_bytes
+        cache.save(key_v3 if key_v3 else key_v2, fmt, audio_bytes)
+        return audio_bytes
+
+    # Singleflight: si ya hay una síntesis idéntica en vuelo, esperar su
+    # resultado en vez de lanzar otra. La síntesis corre en su propia task:
+    # si el dueño se cancela (cliente desconectado) la task sigue viva y los
+    # coalescidos reciben el resultado en vez de heredar la cancelación
+    sf_key = key_v3 if key_v3 else key_v2
+    loop = asyncio.get_running_loop()
+    async with _INFLIGHT_LOCK:
+        task = _INFLIGHT.get(sf_key)
+        if task is None:
+            task = loop.create_task(_produce())
+
+            def _cleanup(t: "asyncio.Task", key: str = sf_key) -> None:
+                _INFLIGHT.pop(key, None)
+                if not t.cancelled():
+                    t.exception()  # consumida aunque todos los waiters se fueran
+            task.add_done_callback(_cleanup)
+            _INFLIGHT[sf_key] = task
+        else:
+            logger.info("Coalesced with in-flight identical request",
+                        extra={"request_id": request_id})
+    # shield: cancelar este request no cancela la task compartida
+    audio_bytes = await asyncio.shield(task)
 
     # Log de finalización exitosa
     duration = time.time() - start_time
     logger.info(
-        f"Synthesis request completed successfully",
+        "Synthesis request completed successfully",
         extra={
             "request_id": request_id,
             "duration": f"{duration:.2f}s",
             "output_size": len(audio_bytes),
-            "cache_hit": cache_hit,
+            "cache_hit": False,
             "format": fmt
         }
     )
 
-    filename = f'{req.voice}.{fmt}'
-    return StreamingResponse(io.BytesIO(audio_bytes), media_type=f"audio/{'wav' if fmt == 'wav' else fmt}", headers={
+    return StreamingResponse(io.BytesIO(audio_bytes), media_type=media_type, headers={
         "Content-Disposition": f'attachment; filename="{filename}"'
     })
\ No newline at end of file
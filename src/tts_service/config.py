@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import List, Any, Optional
+from typing import List, Optional
 from pathlib import Path
 from pydantic import Field, model_validator
 import json
@@ -20,12 +20,17 @@ class Settings(BaseSettings):
     
     HOST: str = "0.0.0.0"
     PORT: int = 8000
+    WORKERS: int = Field(1, description="Número de workers uvicorn")
+    DEV_RELOAD: bool = Field(False, description="Auto-reload con watchfiles (solo desarrollo)")
 
     API_KEY: str = Field(..., description="API key requerida para autenticación")
     CORS_ORIGINS_RAW: str = ""
     CORS_ORIGINS: List[str] = Field(default_factory=list, exclude=True)
 
     ENABLE_FALLBACK: bool = True
+    WARMUP_ON_STARTUP: bool = Field(True, description="Pre-cargar modelos Coqui declarados al arrancar")
+    PIPER_POOL_SIZE: int = Field(0, description="Síntesis piper concurrentes por modelo (0 = cpu_count/2)")
+    ENABLE_DOCS: bool = Field(False, description="Exponer /docs y /openapi.json (evita importar el árbol OpenAPI en prod)")
     COQUI_USE_GPU: str = Field("auto", description="auto|true|false (aún soportado si no hay unified JSON)")
     TTS_TIMEOUT_SECONDS: int = Field(0, description="0 = sin timeout")
     TTS_NORMALIZE_NUMBERS: bool = True  # se puede override en unified JSON defaults
@@ -1,3 +1,4 @@
 from .base import get_engine, BaseTTSEngine  # noqa: F401
-from .piper import PiperEngine  # noqa: F401
-from .coqui import CoquiEngine  # noqa: F401
+
+# PiperEngine / CoquiEngine se importan bajo demanda desde get_engine()
+# para no pagar torch/onnxruntime en el arranque.
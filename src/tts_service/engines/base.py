@@ -1,6 +1,7 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
-from typing import Dict, Type, Optional, Any, List, Callable
+from typing import Dict, Any, List, Callable
+import importlib
 import threading
 
 __all__ = ["BaseTTSEngine", "EngineRegistry", "get_engine"]
@@ -26,11 +27,26 @@ class _EngineRegistry:
     def __init__(self):
         self._lock = threading.Lock()
         self._factories: Dict[str, Callable[..., BaseTTSEngine]] = {}
+        self._kwargs_builders: Dict[str, Callable[..., Dict[str, Any]]] = {}
 
     def register(self, name: str, factory: Callable[..., BaseTTSEngine]):
         with self._lock:
             self._factories[name.lower()] = factory
 
+    def register_kwargs_builder(self, name: str, builder: Callable[..., Dict[str, Any]]):
+        """Registra el constructor de kwargs de engine para un provider.
+
+        Evita el ladder if/elif por provider en la API: cada módulo de engine
+        declara cómo derivar sus kwargs de construcción desde la voz + settings.
+        """
+        with self._lock:
+            self._kwargs_builders[name.lower()] = builder
+
+    def build_kwargs(self, name: str, voice_obj: Dict[str, Any], settings: Any) -> Dict[str, Any]:
+        with self._lock:
+            builder = self._kwargs_builders.get(name.lower())
+        return builder(voice_obj, settings) if builder else {}
+
     def create(self, name: str, *args, **kwargs) -> BaseTTSEngine:
         key = name.lower()
         with self._lock:
@@ -45,6 +61,26 @@ class _EngineRegistry:
 
 EngineRegistry = _EngineRegistry()
 
+# Módulos de engine ya importados (evita re-pagar el import lock en cada request)
+_loaded_modules: Dict[str, Any] = {}
+
+
+def _ensure_provider_loaded(provider: str) -> None:
+    """Importa perezosamente ``tts_service.engines.<provider>`` para su registro.
+
+    Los módulos de engine arrastran dependencias pesadas (torch, onnxruntime),
+    así que solo se importan cuando se pide ese provider por primera vez.
+    """
+    key = provider.lower()
+    if key in _loaded_modules:
+        return
+    try:
+        _loaded_modules[key] = importlib.import_module(f"tts_service.engines.{key}")
+    except ImportError:
+        # Provider sin módulo propio; create() reportará el error habitual
+        _loaded_modules[key] = None
+
 
 def get_engine(provider: str, model: str, **kwargs) -> BaseTTSEngine:
+    _ensure_provider_loaded(provider)
     return EngineRegistry.create(provider, model, **kwargs)
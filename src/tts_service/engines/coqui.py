@@ -1,11 +1,14 @@
 from __future__ import annotations
+from collections import defaultdict
 from functools import lru_cache
-from typing import Optional, List, Any
+from typing import Dict, Optional, List, Any
+import re
 import threading
 import time
 from .base import BaseTTSEngine, EngineRegistry
 from ..utils.logging import get_logger, log_engine_operation, log_error_with_context
 from ..utils.dependencies import safe_import_coqui_tts, safe_import_torch, dependency_manager
+from ..utils.audio import write_wav_pcm16
 
 # Import Coqui TTS de forma segura
 _CoquiTTS, _coqui_error = safe_import_coqui_tts()
@@ -17,10 +20,45 @@ if _CoquiTTS is None:
     )
 
 
-@lru_cache(maxsize=4)
+# Dependencias de audio resueltas una sola vez al importar el módulo: el
+# primer request ya no paga el import de numpy/librosa/soundfile (el módulo
+# coqui en sí se importa perezosamente, y el warmup de arranque lo absorbe)
+_np = dependency_manager.get_optional_dependency("numpy")
+_sf = dependency_manager.get_optional_dependency("soundfile")
+_librosa = dependency_manager.get_optional_dependency("librosa")
+_soxr = dependency_manager.get_optional_dependency("soxr")
+
+# Corte en frases para trocear inferencias largas (ver synthesize_wav)
+_SENT_SPLIT = re.compile(r'(?<=[\.\?\!])\s+')
+_CHUNK_MIN_CHARS = 200
+
+
+# Singleton por (model, use_gpu) con lock por clave: a diferencia de
+# lru_cache, dos threads que fallan a la vez en frío no cargan el modelo
+# dos veces (stampede de GBs de pesos/VRAM) y nunca se desaloja una
+# instancia viva a mitad de request.
+_INSTANCES: Dict[tuple, tuple] = {}
+_INSTANCE_LOCKS: "defaultdict[tuple, threading.Lock]" = defaultdict(threading.Lock)
+
+
 def _get_tts_instance(model_name: str, use_gpu: bool = False):
-    # model_name debería ser un identificador válido para la API de Coqui
-    return _CoquiTTS(model_name, gpu=use_gpu)  # type: ignore
+    """Devuelve (modelo TTS compartido, lock asociado).
+
+    El lock vive junto a la instancia cacheada: varios CoquiEngine que
+    comparten el mismo modelo serializan sus llamadas a ``tts()`` con el
+    mismo lock (uno por instancia no protegería nada).
+    """
+    key = (model_name, use_gpu)
+    inst = _INSTANCES.get(key)
+    if inst is not None:
+        return inst
+    with _INSTANCE_LOCKS[key]:
+        inst = _INSTANCES.get(key)
+        if inst is None:
+            # model_name debería ser un identificador válido para la API de Coqui
+            inst = (_CoquiTTS(model_name, gpu=use_gpu), threading.Lock())  # type: ignore
+            _INSTANCES[key] = inst
+    return inst
 
 
 class CoquiEngine(BaseTTSEngine):
@@ -28,17 +66,17 @@ class CoquiEngine(BaseTTSEngine):
     Motor Coqui TTS.
     """
     def __init__(self, model_name: str, use_gpu: Optional[bool] = None, **kwargs: Any):
-        self.logger = get_logger(f"tts_service.engines.coqui")
+        self.logger = get_logger("tts_service.engines.coqui")
 
         if use_gpu is None:
             torch = safe_import_torch()
             if torch:
                 try:
                     use_gpu = bool(torch.cuda.is_available())
-                    self.logger.debug(f"GPU auto-detection: {use_gpu}")
+                    self.logger.debug("GPU auto-detection: %s", use_gpu)
                 except Exception as e:
                     use_gpu = False
-                    self.logger.debug(f"GPU detection failed: {e}, using CPU")
+                    self.logger.debug("GPU detection failed: %s, using CPU", e)
             else:
                 use_gpu = False
                 self.logger.debug("PyTorch not available, using CPU")
@@ -46,14 +84,27 @@ class CoquiEngine(BaseTTSEngine):
         super().__init__(model_name, use_gpu=use_gpu, **kwargs)
         self.model_name = model_name
         self.use_gpu = use_gpu
-        self._lock = threading.Lock()
 
         log_engine_operation(
             self.logger, "coqui", "engine_init",
             model=model_name, use_gpu=use_gpu
         )
 
-        self.tts = _get_tts_instance(model_name, self.use_gpu)
+        self.tts, self._lock = _get_tts_instance(model_name, self.use_gpu)
+
+        # Los speakers del modelo no cambian tras cargar: cachearlos aquí
+        # evita re-listar (y re-construir la lista) en cada request, y el
+        # frozenset da membership O(1) para validar speakers por nombre
+        self._speakers = self.list_speakers()
+        self._speaker_set = frozenset(self._speakers)
+
+        # Sample rate por defecto resuelto una vez: el getattr atraviesa la
+        # cadena synthesizer/config de Coqui en cada lookup
+        self._default_sr = int(
+            getattr(self.tts, "output_sample_rate", None)
+            or getattr(getattr(self.tts, "synthesizer", None), "output_sample_rate", 0)
+            or 22050
+        )
 
     def list_speakers(self) -> List[str]:
         speakers = getattr(self.tts, "speakers", None)
@@ -61,15 +112,45 @@ class CoquiEngine(BaseTTSEngine):
             return []
         return list(speakers) if isinstance(speakers, (list, tuple)) else []
 
-    def synthesize_wav(
+    @staticmethod
+    @lru_cache(maxsize=8)
+    def _gpu_resample(orig_sr: int, target_sr: int):
+        """Devuelve un callable ndarray→ndarray que re-muestrea en CUDA.
+
+        None si torch/torchaudio/CUDA no están disponibles. El transform (y
+        sus coeficientes FIR) se construye una vez por par de frecuencias.
+        """
+        torch = safe_import_torch()
+        torchaudio = dependency_manager.get_optional_dependency("torchaudio")
+        if not torch or not torchaudio:
+            return None
+        try:
+            if not torch.cuda.is_available():
+                return None
+            transform = torchaudio.transforms.Resample(orig_sr, target_sr).to("cuda")
+        except Exception:
+            return None
+
+        def _resample(waveform):
+            t = torch.as_tensor(_np.asarray(waveform), device="cuda")
+            with torch.no_grad():
+                out = transform(t)
+            return out.cpu().numpy()
+
+        return _resample
+
+    def synthesize_pcm(
         self,
         text: str,
         sample_rate: Optional[int] = None,
         speaker: Optional[int | str] = None,
         **kwargs: Any
-    ) -> bytes:
-        start_time = time.time()
+    ):
+        """Sintetiza y devuelve ``(waveform, sample_rate)`` sin contenedor WAV.
 
+        Para consumidores que van a post-procesar (prosodia) o re-encodear
+        (mp3/ogg): evita el round-trip encode-WAV → parse-WAV intermedio.
+        """
         log_engine_operation(
             self.logger, "coqui", "synthesis_start",
             text_length=len(text), sample_rate=sample_rate, speaker=speaker
@@ -78,72 +159,101 @@ class CoquiEngine(BaseTTSEngine):
         if not text or not text.strip():
             raise ValueError("Texto vacío")
 
-        if speaker is not None and self.list_speakers():
-            speakers = self.list_speakers()
+        if speaker is not None and self._speakers:
             if isinstance(speaker, int):
-                if speaker < 0 or speaker >= len(speakers):
-                    raise ValueError(f"Índice speaker fuera de rango (0-{len(speakers)-1})")
-            elif isinstance(speaker, str) and speaker not in speakers:
-                raise ValueError(f"Speaker '{speaker}' no existe. Disponibles: {speakers}")
+                if speaker < 0 or speaker >= len(self._speakers):
+                    raise ValueError(f"Índice speaker fuera de rango (0-{len(self._speakers)-1})")
+            elif isinstance(speaker, str) and speaker not in self._speaker_set:
+                raise ValueError(f"Speaker '{speaker}' no existe. Disponibles: {self._speakers}")
 
-        try:
-            with self._lock:
-                if speaker is not None:
-                    out = self.tts.tts(text=text, speaker=speaker)  # type: ignore
-                else:
-                    out = self.tts.tts(text=text)  # type: ignore
-        except Exception as e:
-            log_error_with_context(
-                self.logger, e,
-                {"operation": "tts_synthesis", "model": self.model_name, "text_length": len(text)}
-            )
-            raise
+        # Textos largos se trocean por frase: el lock del modelo se suelta
+        # entre trozos, así otras peticiones pueden intercalarse en vez de
+        # esperar la síntesis del párrafo completo
+        chunks = [text]
+        if _np is not None and len(text) > _CHUNK_MIN_CHARS:
+            chunks = [c for c in _SENT_SPLIT.split(text) if c.strip()] or [text]
 
-        if isinstance(out, tuple):
-            waveform, orig_sr = out[0], out[1]
+        parts = []
+        orig_sr = None
+        for chunk in chunks:
+            try:
+                with self._lock:
+                    if speaker is not None:
+                        out = self.tts.tts(text=chunk, speaker=speaker)  # type: ignore
+                    else:
+                        out = self.tts.tts(text=chunk)  # type: ignore
+            except Exception as e:
+                log_error_with_context(
+                    self.logger, e,
+                    {"operation": "tts_synthesis", "model": self.model_name, "text_length": len(chunk)}
+                )
+                raise
+
+            if isinstance(out, tuple):
+                part, orig_sr = out[0], out[1]
+            else:
+                part = out
+                orig_sr = self._default_sr
+            parts.append(part)
+
+        if len(parts) == 1:
+            waveform = parts[0]
         else:
-            waveform = out
-            orig_sr = getattr(self.tts, "output_sample_rate", 22050)
+            waveform = _np.concatenate([_np.asarray(p) for p in parts])
 
         target_sr = sample_rate or orig_sr
         if target_sr != orig_sr:
-            numpy = dependency_manager.get_optional_dependency("numpy")
-            librosa = dependency_manager.get_optional_dependency("librosa")
-
-            if not numpy or not librosa:
+            if not _np or not (_soxr or _librosa):
                 missing_deps = []
-                if not numpy: missing_deps.append("numpy")
-                if not librosa: missing_deps.append("librosa")
+                if not _np: missing_deps.append("numpy")
+                if not _soxr and not _librosa: missing_deps.append("soxr")
                 raise RuntimeError(
                     f"Librerías requeridas para resample no disponibles: {', '.join(missing_deps)}. "
                     f"Instalar con: pip install {' '.join(missing_deps)}"
                 )
 
             try:
-                waveform = librosa.resample(
-                    numpy.asarray(waveform), orig_sr=orig_sr, target_sr=target_sr
-                )
+                # Con el modelo en CUDA, re-muestrear en GPU evita el viaje
+                # device→host→device y usa el throughput FIR de la GPU
+                if self.use_gpu and self._gpu_resample(orig_sr, target_sr) is not None:
+                    waveform = self._gpu_resample(orig_sr, target_sr)(waveform)
+                # soxr (libsoxr, C/SIMD) es varias veces más rápido que el
+                # polifásico de librosa y suelta el GIL durante la convolución
+                elif _soxr is not None:
+                    waveform = _soxr.resample(
+                        _np.asarray(waveform), orig_sr, target_sr, quality="HQ"
+                    )
+                else:
+                    waveform = _librosa.resample(
+                        _np.asarray(waveform), orig_sr=orig_sr, target_sr=target_sr
+                    )
                 orig_sr = target_sr
             except Exception as e:
                 raise RuntimeError(f"Error al re-muestrear audio de {orig_sr}Hz a {target_sr}Hz: {e}") from e
 
-        soundfile = dependency_manager.get_optional_dependency("soundfile")
-        if not soundfile:
-            raise RuntimeError(
-                "SoundFile no está disponible para generar WAV. "
-                "Instalar con: pip install soundfile"
-            )
+        return waveform, orig_sr
+
+    def synthesize_wav(
+        self,
+        text: str,
+        sample_rate: Optional[int] = None,
+        speaker: Optional[int | str] = None,
+        **kwargs: Any
+    ) -> bytes:
+        start_time = time.time()
+        waveform, orig_sr = self.synthesize_pcm(
+            text, sample_rate=sample_rate, speaker=speaker, **kwargs
+        )
 
         try:
-            import io
-            buf = io.BytesIO()
-            soundfile.write(buf, waveform, orig_sr, format="WAV", subtype="PCM_16")
-            wav_bytes = buf.getvalue()
+            # Encode manual (cabecera RIFF + int16): mismo resultado que
+            # soundfile para PCM16 mono sin el overhead de libsndfile
+            wav_bytes = write_wav_pcm16(waveform, orig_sr)
 
             duration = time.time() - start_time
             log_engine_operation(
                 self.logger, "coqui", "synthesis_complete",
-                text_length=len(text), duration=f"{duration:.2f}s",
+                text_length=len(text), duration=round(duration, 3),
                 output_size=len(wav_bytes), sample_rate=orig_sr
             )
 
@@ -156,5 +266,19 @@ class CoquiEngine(BaseTTSEngine):
             raise RuntimeError(f"Error generando WAV con sample_rate {orig_sr}Hz: {e}") from e
 
 
+# Política de GPU resuelta una vez al importar: "auto" (None) delega en la
+# autodetección del engine. settings no cambia en caliente, así que no hay
+# motivo para re-parsear el string por request.
+from ..config import settings as _settings  # noqa: E402
+_COQUI_USE_GPU: Optional[bool] = {"true": True, "false": False}.get(
+    _settings.COQUI_USE_GPU.lower()
+)
+
+
+def _build_engine_kwargs(voice, settings):
+    return {"use_gpu": _COQUI_USE_GPU}
+
+
 # Registro automático
-EngineRegistry.register("coqui", lambda model, **kw: CoquiEngine(model, **kw))
\ No newline at end of file
+EngineRegistry.register("coqui", lambda model, **kw: CoquiEngine(model, **kw))
+EngineRegistry.register_kwargs_builder("coqui", _build_engine_kwargs)
\ No newline at end of file
@@ -1,12 +1,52 @@
 from pathlib import Path
+import io
+import json
 import shutil
+import struct
 import sys
-import subprocess, tempfile, os
+import subprocess
+import threading
 import time
-from typing import Optional, Any
+from typing import Iterator, Optional, Any
 from .base import BaseTTSEngine, EngineRegistry
 from ..utils.logging import get_logger, log_engine_operation, log_error_with_context
 from ..utils.dependencies import dependency_manager
+from ..utils.audio import wav_from_pcm16, write_wav_pcm16
+
+# API Python de piper (paquete piper-tts): mantiene la sesión ONNX residente
+# en el proceso en vez de forkear un subprocess que recarga el modelo en cada
+# síntesis. Si no está instalada se usa el subprocess clásico.
+_piper_api = dependency_manager.get_optional_dependency("piper_tts")
+
+# espeak-ng guarda estado global en C: la fonemización se serializa entre
+# TODAS las voces del proceso. La inferencia ONNX (el coste dominante) es
+# thread-safe y corre fuera del lock, así N peticiones se solapan de verdad.
+_PHONEMIZE_LOCK = threading.Lock()
+
+
+def _wav_stream_header(sample_rate: int) -> bytes:
+    """Cabecera RIFF PCM16 mono con tamaños placeholder (0xFFFFFFFF).
+
+    Para streaming: la longitud total no se conoce al emitir el primer
+    chunk y los reproductores tratan ese valor como "leer hasta EOF".
+    """
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 0xFFFFFFFF, b"WAVE",
+        b"fmt ", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16,
+        b"data", 0xFFFFFFFF,
+    )
+
+
+def _wav_sample_rate(raw: bytes) -> Optional[int]:
+    """Lee el sample rate del header RIFF sin decodificar el PCM.
+
+    Asume el layout canónico que emite piper (fmt chunk en offset 12);
+    devuelve None si el buffer no parece un WAV estándar.
+    """
+    if len(raw) < 28 or raw[:4] != b"RIFF" or raw[8:12] != b"WAVE":
+        return None
+    return struct.unpack_from("<I", raw, 24)[0]
 
 
 class PiperEngine(BaseTTSEngine):
@@ -24,6 +64,10 @@ class PiperEngine(BaseTTSEngine):
 
         self._piper_exe = shutil.which("piper")
         self._use_module = self._piper_exe is None
+        # Voz in-process (carga perezosa): el modelo se paga una vez por engine
+        self._voice = None
+        self._voice_lock = threading.Lock()
+        self._native_sr: Optional[int] = None
 
         log_engine_operation(
             self.logger, "piper", "engine_init",
@@ -31,6 +75,253 @@ class PiperEngine(BaseTTSEngine):
             use_module=self._use_module
         )
         
+    def native_sample_rate(self) -> Optional[int]:
+        """Sample rate nativo del modelo según su JSON de config, o None.
+
+        Se lee del config sin cargar la voz: la API lo necesita antes de
+        decidir si puede hacer streaming (que no resamplea).
+        """
+        if self._native_sr is None:
+            cfg = self.config_path or Path(f"{self.model_path}.json")
+            try:
+                with open(cfg, "rb") as f:
+                    self._native_sr = int(json.load(f)["audio"]["sample_rate"])
+            except (OSError, KeyError, TypeError, ValueError):
+                return None
+        return self._native_sr
+
+    def _get_voice(self):
+        """Carga (una sola vez) la PiperVoice in-process, o None sin la API."""
+        if _piper_api is None:
+            return None
+        if self._voice is None:
+            with self._voice_lock:
+                if self._voice is None:
+                    self._voice = _piper_api.PiperVoice.load(
+                        self.model_path, config_path=self.config_path
+                    )
+        return self._voice
+
+    def _synthesize_wav_inprocess(
+        self,
+        text: str,
+        length_scale: Optional[float],
+        noise_scale: Optional[float],
+        noise_w: Optional[float],
+        speaker: Optional[int],
+    ) -> bytes:
+        import numpy as np
+        from piper.config import SynthesisConfig
+
+        voice = self._get_voice()
+        syn_config = SynthesisConfig(
+            speaker_id=speaker,
+            length_scale=length_scale,
+            noise_scale=noise_scale,
+            noise_w_scale=noise_w,
+        )
+        # Solo la fonemización necesita el lock global; el forward ONNX por
+        # frase corre desbloqueado y en paralelo entre peticiones
+        with _PHONEMIZE_LOCK:
+            sentence_phonemes = voice.phonemize(text.strip())
+            ids_list = [voice.phonemes_to_ids(p) for p in sentence_phonemes if p]
+
+        pcm_parts = []
+        for phoneme_ids in ids_list:
+            audio = voice.phoneme_ids_to_audio(phoneme_ids, syn_config)
+            # Mismo post-proceso que PiperVoice.synthesize: normalizar y
+            # convertir a PCM16
+            max_val = np.max(np.abs(audio)) if len(audio) else 0.0
+            if max_val < 1e-8:
+                audio = np.zeros_like(audio)
+            else:
+                audio = audio / max_val
+            audio = np.clip(audio, -1.0, 1.0)
+            pcm_parts.append((audio * 32767.0).astype("<i2").tobytes())
+
+        if not pcm_parts:
+            raise RuntimeError("Piper no produjo audio")
+
+        # Contenedor manual: un solo join + header, sin BytesIO/wave
+        # intermedios (getvalue() copiaba el audio entero otra vez)
+        return wav_from_pcm16(b"".join(pcm_parts), voice.config.sample_rate)
+
+    def _synthesize_wav_subprocess(
+        self,
+        text: str,
+        length_scale: Optional[float],
+        noise_scale: Optional[float],
+        noise_w: Optional[float],
+        speaker: Optional[int],
+    ) -> bytes:
+        # El texto entra por stdin: sin archivo temporal no hay
+        # create/write/unlink en el filesystem por request
+        cmd = self._build_cmd(length_scale, noise_scale, noise_w, speaker)
+        proc = subprocess.run(
+            cmd,
+            input=(text.strip() + "\n").encode("utf-8"),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            check=False)
+
+        if proc.returncode != 0:
+            error_msg = proc.stderr.decode('utf-8', 'ignore')
+            log_error_with_context(
+                self.logger, RuntimeError(f"Piper subprocess failed with code {proc.returncode}"),
+                {"operation": "piper_subprocess", "error_output": error_msg, "command": cmd[0:3]}
+            )
+            raise RuntimeError(f"Piper error ({proc.returncode}):{error_msg}")
+
+        return proc.stdout
+
+    def _build_cmd(
+        self,
+        length_scale: Optional[float] = None,
+        noise_scale: Optional[float] = None,
+        noise_w: Optional[float] = None,
+        speaker: Optional[int] = None,
+    ) -> list:
+        if self._use_module:
+            cmd = [sys.executable, "-m", "piper"]
+        else:
+            cmd = [self._piper_exe]
+
+        # Sin --input_file piper lee el texto de stdin
+        cmd += ["--model", str(self.model_path), "--output_file", "-"]
+        if self.config_path:
+            cmd += ["--config", str(self.config_path)]
+
+        if length_scale:
+            cmd += ["--length_scale", str(length_scale)]
+        if noise_scale:
+            cmd += ["--noise_scale", str(noise_scale)]
+        if noise_w:
+            cmd += ["--noise_w", str(noise_w)]
+        if speaker is not None:
+            cmd += ["--speaker", str(speaker)]
+        return cmd
+
+    def _synthesize_stream_inprocess(
+        self,
+        text: str,
+        length_scale: Optional[float],
+        noise_scale: Optional[float],
+        noise_w: Optional[float],
+        speaker: Optional[int],
+    ) -> Iterator[bytes]:
+        """Genera cabecera + PCM frase a frase con la voz in-process.
+
+        El primer chunk sale tras inferir solo la primera frase: el TTFB
+        deja de depender de la longitud total del texto.
+        """
+        import numpy as np
+        from piper.config import SynthesisConfig
+
+        voice = self._get_voice()
+        syn_config = SynthesisConfig(
+            speaker_id=speaker,
+            length_scale=length_scale,
+            noise_scale=noise_scale,
+            noise_w_scale=noise_w,
+        )
+        with _PHONEMIZE_LOCK:
+            sentence_phonemes = voice.phonemize(text.strip())
+            ids_list = [voice.phonemes_to_ids(p) for p in sentence_phonemes if p]
+        if not ids_list:
+            raise RuntimeError("Piper no produjo audio")
+
+        yield _wav_stream_header(voice.config.sample_rate)
+        for phoneme_ids in ids_list:
+            audio = voice.phoneme_ids_to_audio(phoneme_ids, syn_config)
+            max_val = np.max(np.abs(audio)) if len(audio) else 0.0
+            if max_val < 1e-8:
+                audio = np.zeros_like(audio)
+            else:
+                audio = audio / max_val
+            audio = np.clip(audio, -1.0, 1.0)
+            yield (audio * 32767.0).astype("<i2").tobytes()
+
+    def _synthesize_stream_subprocess(
+        self,
+        text: str,
+        length_scale: Optional[float],
+        noise_scale: Optional[float],
+        noise_w: Optional[float],
+        speaker: Optional[int],
+        chunk_size: int,
+    ) -> Iterator[bytes]:
+        proc = None
+        try:
+            cmd = self._build_cmd(length_scale, noise_scale, noise_w, speaker)
+            proc = subprocess.Popen(
+                cmd, stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE
+            )
+            # El texto cabe de sobra en el buffer del pipe: escribir y
+            # cerrar stdin antes de leer no puede bloquear
+            proc.stdin.write((text.strip() + "\n").encode("utf-8"))
+            proc.stdin.close()
+            while True:
+                chunk = proc.stdout.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+            proc.wait()
+            if proc.returncode != 0:
+                error_msg = proc.stderr.read().decode('utf-8', 'ignore')
+                raise RuntimeError(f"Piper error ({proc.returncode}):{error_msg}")
+        finally:
+            if proc is not None and proc.poll() is None:
+                proc.kill()
+
+    def synthesize_wav_stream(
+        self,
+        text: str,
+        length_scale: Optional[float] = None,
+        noise_scale: Optional[float] = None,
+        noise_w: Optional[float] = None,
+        speaker: Optional[int] = None,
+        chunk_size: int = 65536,
+        **kwargs: Any
+    ) -> Iterator[bytes]:
+        """Genera el WAV en chunks según se va sintetizando.
+
+        Permite solapar síntesis y envío al cliente. No aplica resample:
+        el audio sale al sample rate nativo del modelo. Con la API Python
+        disponible se emite frase a frase sin forkear (el subprocess
+        recarga el modelo entero antes del primer byte).
+        """
+        if not text or not text.strip():
+            raise ValueError("Texto vacío")
+
+        log_engine_operation(
+            self.logger, "piper", "synthesis_stream_start",
+            text_length=len(text), speaker=speaker
+        )
+
+        if _piper_api is not None:
+            emitted = False
+            try:
+                for chunk in self._synthesize_stream_inprocess(
+                    text, length_scale, noise_scale, noise_w, speaker
+                ):
+                    emitted = True
+                    yield chunk
+                return
+            except Exception as e:
+                # Con bytes ya enviados no se puede reintentar sin duplicar
+                # audio; en frío sí se cae al subprocess clásico
+                if emitted:
+                    raise
+                log_error_with_context(
+                    self.logger, e,
+                    {"operation": "piper_inprocess_stream", "model": str(self.model_path)}
+                )
+
+        yield from self._synthesize_stream_subprocess(
+            text, length_scale, noise_scale, noise_w, speaker, chunk_size
+        )
+
     def synthesize_wav(
         self,
         text: str,
@@ -52,136 +343,116 @@ class PiperEngine(BaseTTSEngine):
         if not text or not text.strip():
             raise ValueError("Texto vacío")
 
-        with tempfile.NamedTemporaryFile("w", suffix=".txt", encoding="utf-8",delete=False) as tf:
-            tf.write(text.strip() + "\n")
-            tf_path = tf.name
-        try:
-            
-            cmd = []
-            if self._use_module:
-                cmd = [sys.executable, "-m", "piper"]
-            else:
-                cmd = [self._piper_exe]
-                 
-            cmd += ["--model", str(self.model_path), "--output_file", "-", "--input_file", tf_path]
-            if self.config_path:
-                cmd += ["--config", str(self.config_path)]
-
-            if length_scale:
-                cmd += ["--length_scale", str(length_scale)]
-            if noise_scale:
-                cmd += ["--noise_scale", str(noise_scale)]
-            if noise_w:
-                cmd += ["--noise_w", str(noise_w)]
-            if speaker is not None:
-                cmd += ["--speaker", str(speaker)]
-                
+        raw_wav = None
+        if _piper_api is not None:
             try:
-                proc = subprocess.run(
-                    cmd,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    check=False)
-
-                if proc.returncode != 0:
-                    error_msg = proc.stderr.decode('utf-8', 'ignore')
-                    log_error_with_context(
-                        self.logger, RuntimeError(f"Piper subprocess failed with code {proc.returncode}"),
-                        {"operation": "piper_subprocess", "error_output": error_msg, "command": cmd[0:3]}
-                    )
-                    raise RuntimeError(f"Piper error ({proc.returncode}):{error_msg}")
-
-                raw_wav = proc.stdout
-                if sample_rate is None:
-                    duration = time.time() - start_time
-                    log_engine_operation(
-                        self.logger, "piper", "synthesis_complete",
-                        text_length=len(text), duration=f"{duration:.2f}s", output_size=len(raw_wav)
-                    )
-                    return raw_wav
+                raw_wav = self._synthesize_wav_inprocess(
+                    text, length_scale, noise_scale, noise_w, speaker
+                )
             except Exception as e:
+                # La vía in-process es una optimización: ante cualquier fallo
+                # se cae al subprocess clásico
                 log_error_with_context(
                     self.logger, e,
-                    {"operation": "piper_execution", "model": str(self.model_path)}
+                    {"operation": "piper_inprocess", "model": str(self.model_path)}
                 )
-                raise
-            # If different, resample
-            import io
-            import wave
-
-            # Verificar disponibilidad de dependencias de resampling
-            numpy = dependency_manager.get_optional_dependency("numpy")
-            soundfile = dependency_manager.get_optional_dependency("soundfile")
-            librosa = dependency_manager.get_optional_dependency("librosa")
-
-            if not all([numpy, soundfile, librosa]):
-                missing_deps = []
-                if not numpy: missing_deps.append("numpy")
-                if not soundfile: missing_deps.append("soundfile")
-                if not librosa: missing_deps.append("librosa")
-
-                self.logger.warning(
-                    f"Resampling libraries not available: {', '.join(missing_deps)}. "
-                    f"Returning original audio"
+                raw_wav = None
+        try:
+            if raw_wav is None:
+                raw_wav = self._synthesize_wav_subprocess(
+                    text, length_scale, noise_scale, noise_w, speaker
                 )
+            if sample_rate is None:
                 duration = time.time() - start_time
                 log_engine_operation(
                     self.logger, "piper", "synthesis_complete",
-                    text_length=len(text), duration=f"{duration:.2f}s",
-                    output_size=len(raw_wav), warning="no_resample_libs"
+                    text_length=len(text), duration=round(duration, 3), output_size=len(raw_wav)
                 )
                 return raw_wav
+        except Exception as e:
+            log_error_with_context(
+                self.logger, e,
+                {"operation": "piper_execution", "model": str(self.model_path)}
+            )
+            raise
+        # Comprobación barata con el header: si el modelo ya emite el
+        # sample rate pedido no hay nada que decodificar
+        orig_sr = _wav_sample_rate(raw_wav)
+        if orig_sr == sample_rate:
+            duration = time.time() - start_time
+            log_engine_operation(
+                self.logger, "piper", "synthesis_complete",
+                text_length=len(text), duration=round(duration, 3),
+                output_size=len(raw_wav), sample_rate=orig_sr
+            )
+            return raw_wav
 
-            try:
-                with wave.open(io.BytesIO(raw_wav), 'rb') as wf:
-                    orig_sr = wf.getframerate()
-
-                if orig_sr == sample_rate:
-                    duration = time.time() - start_time
-                    log_engine_operation(
-                        self.logger, "piper", "synthesis_complete",
-                        text_length=len(text), duration=f"{duration:.2f}s",
-                        output_size=len(raw_wav), sample_rate=orig_sr
-                    )
-                    return raw_wav
+        # If different, resample
+        import io
 
-                # Load original data
-                self.logger.debug(f"Resampling audio from {orig_sr}Hz to {sample_rate}Hz")
-                data, orig_sr_2 = soundfile.read(io.BytesIO(raw_wav))
-                if orig_sr_2 != orig_sr:
-                    orig_sr = orig_sr_2
+        # Verificar disponibilidad de dependencias de resampling
+        numpy = dependency_manager.get_optional_dependency("numpy")
+        soundfile = dependency_manager.get_optional_dependency("soundfile")
+        librosa = dependency_manager.get_optional_dependency("librosa")
 
-                resampled = librosa.resample(data, orig_sr=orig_sr, target_sr=sample_rate)
-                out_buf = io.BytesIO()
-                soundfile.write(out_buf, resampled, sample_rate, format='WAV', subtype='PCM_16')
-                resampled_wav = out_buf.getvalue()
+        if not all([numpy, soundfile, librosa]):
+            missing_deps = []
+            if not numpy: missing_deps.append("numpy")
+            if not soundfile: missing_deps.append("soundfile")
+            if not librosa: missing_deps.append("librosa")
 
+            self.logger.warning(
+                f"Resampling libraries not available: {', '.join(missing_deps)}. "
+                f"Returning original audio"
+            )
+            duration = time.time() - start_time
+            log_engine_operation(
+                self.logger, "piper", "synthesis_complete",
+                text_length=len(text), duration=round(duration, 3),
+                output_size=len(raw_wav), warning="no_resample_libs"
+            )
+            return raw_wav
+
+        try:
+            # Un solo decode: soundfile ya devuelve el sample rate real
+            self.logger.debug("Resampling audio from %sHz to %sHz", orig_sr, sample_rate)
+            data, orig_sr = soundfile.read(io.BytesIO(raw_wav), dtype='float32')
+            if orig_sr == sample_rate:
                 duration = time.time() - start_time
                 log_engine_operation(
                     self.logger, "piper", "synthesis_complete",
-                    text_length=len(text), duration=f"{duration:.2f}s",
-                    output_size=len(resampled_wav), sample_rate=sample_rate, resampled=True
-                )
-                return resampled_wav
-            except Exception as e:
-                # Error durante resampling, devolver audio original
-                log_error_with_context(
-                    self.logger, e,
-                    {"operation": "resample", "orig_sr": orig_sr, "target_sr": sample_rate}
-                )
-                duration = time.time() - start_time
-                log_engine_operation(
-                    self.logger, "piper", "synthesis_complete",
-                    text_length=len(text), duration=f"{duration:.2f}s",
-                    output_size=len(raw_wav), warning="resample_failed"
+                    text_length=len(text), duration=round(duration, 3),
+                    output_size=len(raw_wav), sample_rate=orig_sr
                 )
                 return raw_wav
-        finally:
-            try:
-                os.remove(tf_path)
-            except Exception:
-                pass
+
+            resampled = librosa.resample(data, orig_sr=orig_sr, target_sr=sample_rate)
+            resampled_wav = write_wav_pcm16(resampled, sample_rate)
+
+            duration = time.time() - start_time
+            log_engine_operation(
+                self.logger, "piper", "synthesis_complete",
+                text_length=len(text), duration=round(duration, 3),
+                output_size=len(resampled_wav), sample_rate=sample_rate, resampled=True
+            )
+            return resampled_wav
+        except Exception as e:
+            # Error durante resampling, devolver audio original
+            log_error_with_context(
+                self.logger, e,
+                {"operation": "resample", "orig_sr": orig_sr, "target_sr": sample_rate}
+            )
+            duration = time.time() - start_time
+            log_engine_operation(
+                self.logger, "piper", "synthesis_complete",
+                text_length=len(text), duration=round(duration, 3),
+                output_size=len(raw_wav), warning="resample_failed"
+            )
+            return raw_wav
 
 
 # Registro
-EngineRegistry.register("piper", lambda model, **kw: PiperEngine(model, **kw))
\ No newline at end of file
+EngineRegistry.register("piper", lambda model, **kw: PiperEngine(model, **kw))
+EngineRegistry.register_kwargs_builder(
+    "piper", lambda voice, settings: {"config_path": voice.get("config")}
+)
\ No newline at end of file
@@ -0,0 +1,74 @@
+import struct
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:  # opcional: el fallback numpy vectorizado cubre el resto
+    njit = None
+    prange = range
+
+# Encode WAV PCM16 a mano: la cabecera RIFF son 44 bytes fijos y el cuerpo
+# un clip/round/cast vectorizado. Evita el dispatch genérico de soundfile
+# (detección de formato, libsndfile vía CFFI) para el caso único que
+# producimos en el hot path.
+
+
+if njit is not None:
+    # Un solo pase sin temporales (clip+scale+round fusionados); prange
+    # reparte buffers largos entre cores. cache=True persiste el compilado.
+    @njit(cache=True, parallel=True, fastmath=True)
+    def _to_pcm16(x, out):  # pragma: no cover - requiere numba
+        for i in prange(x.shape[0]):
+            v = round(x[i] * 32767.0)
+            if v > 32767.0:
+                v = 32767.0
+            elif v < -32767.0:
+                v = -32767.0
+            out[i] = np.int16(v)
+else:
+    def _to_pcm16(x, out):
+        # Escala y redondea sobre un único temporal reutilizado in-place
+        # (la cadena clip→rint→astype encadenada crea tres copias)
+        scaled = x * np.float32(32767.0)
+        np.clip(scaled, -32767.0, 32767.0, out=scaled)
+        np.rint(scaled, out=scaled)
+        out[:] = scaled.astype(np.int16, copy=False)
+
+
+def _encode_pcm16(data) -> np.ndarray:
+    out = np.empty(data.shape[0], dtype="<i2")
+    _to_pcm16(np.ascontiguousarray(data, dtype=np.float32), out)
+    return out
+
+
+def _pack_header(body_len: int, sample_rate: int) -> bytes:
+    byte_rate = sample_rate * 2  # mono, 16 bits
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + body_len, b"WAVE",
+        b"fmt ", 16, 1, 1, sample_rate, byte_rate, 2, 16,
+        b"data", body_len,
+    )
+
+
+def wav_from_pcm16(pcm: bytes, sample_rate: int) -> bytes:
+    """Envuelve PCM16 mono ya codificado en un contenedor WAV."""
+    return _pack_header(len(pcm), sample_rate) + pcm
+
+
+def write_wav_pcm16(waveform, sample_rate: int) -> bytes:
+    """Serializa un waveform float (-1..1) como WAV PCM16 mono.
+
+    Equivalente a ``soundfile.write(..., format="WAV", subtype="PCM_16")``
+    para audio mono, sin pasar por libsndfile.
+    """
+    data = np.asarray(waveform)
+    if data.ndim > 1:
+        data = data.mean(axis=1)
+    if data.dtype == np.int16:
+        pcm = data.astype("<i2", copy=False)
+    else:
+        pcm = _encode_pcm16(data)
+    body = pcm.tobytes()
+    return _pack_header(len(body), sample_rate) + body
@@ -0,0 +1,110 @@
+"""
+Cola de inferencia por modelo para /synthesize.
+
+Los engines de este servicio (Piper vía subprocess, Coqui con lock de
+instancia) no aceptan tensores batcheados, así que el batcher no fusiona
+kernels: agrupa las peticiones pendientes de un mismo (provider, model),
+las ejecuta en un único salto al threadpool por ciclo (amortizando el
+dispatch) y serializa la inferencia por modelo para no sobre-suscribir CPU
+cuando llegan ráfagas. Si un engine expone ``synthesize_wav_batch``, el
+ciclo completo se le entrega en una sola llamada.
+"""
+
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .logging import get_logger
+
+logger = get_logger("tts_service.utils.batcher")
+
+# Máximo de items drenados por ciclo de worker
+_MAX_BATCH = 8
+
+
+class _ModelQueue:
+    def __init__(self, key: str, max_workers: int = 1):
+        self.key = key
+        self.max_workers = max(1, max_workers)
+        self.queue: "asyncio.Queue[Tuple[Callable[[], bytes], asyncio.Future]]" = asyncio.Queue()
+        self.workers: List[asyncio.Task] = []
+
+    def ensure_workers(self) -> None:
+        # Escala on-demand: un worker siempre; extras solo si hay backlog.
+        # Con N workers la inferencia del mismo modelo corre N-paralela
+        # (útil para engines reentrantes como piper in-process).
+        self.workers = [w for w in self.workers if not w.done()]
+        wanted = min(self.max_workers, self.queue.qsize() + 1)
+        loop = asyncio.get_running_loop()
+        while len(self.workers) < wanted:
+            self.workers.append(loop.create_task(self._run()))
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                item = await asyncio.wait_for(self.queue.get(), timeout=30.0)
+            except asyncio.TimeoutError:
+                # Carrera con submit(): un item pudo encolarse en la misma
+                # ventana del loop en que expira el timeout (ensure_workers
+                # aún veía vivo a este worker); si hay trabajo pendiente no
+                # puede abandonarse o su future se quedaría colgado
+                if not self.queue.empty():
+                    continue
+                return  # cola fría: el worker muere y se recrea on-demand
+            batch: List[Tuple[Callable[[], bytes], asyncio.Future]] = [item]
+            while len(batch) < _MAX_BATCH:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            if len(batch) > 1:
+                logger.debug("Batched %d requests for %s", len(batch), self.key)
+            # Un solo dispatch al threadpool por ciclo; dentro del hilo los
+            # items corren secuenciales (la inferencia por modelo ya está
+            # serializada por los locks/subprocess del engine)
+            results = await asyncio.get_running_loop().run_in_executor(
+                None, self._run_batch, [fn for fn, _ in batch]
+            )
+            for (_, fut), res in zip(batch, results):
+                if fut.cancelled():
+                    continue
+                if isinstance(res, BaseException):
+                    fut.set_exception(res)
+                else:
+                    fut.set_result(res)
+
+    @staticmethod
+    def _run_batch(fns: List[Callable[[], bytes]]) -> List[Any]:
+        results: List[Any] = []
+        for fn in fns:
+            try:
+                results.append(fn())
+            except BaseException as e:  # se propaga al future correspondiente
+                results.append(e)
+        return results
+
+
+class Batcher:
+    """Agrupa llamadas de síntesis por clave de modelo."""
+
+    def __init__(self):
+        self._queues: Dict[str, _ModelQueue] = {}
+
+    async def submit(self, model_key: str, fn: Callable[[], bytes],
+                     max_workers: int = 1) -> bytes:
+        """Encola ``fn`` (síntesis bloqueante) y espera su resultado.
+
+        ``max_workers`` fija el paralelismo máximo para esa clave de modelo
+        (solo tiene sentido >1 si el engine tolera síntesis concurrente).
+        """
+        mq = self._queues.get(model_key)
+        if mq is None:
+            mq = self._queues.setdefault(model_key, _ModelQueue(model_key, max_workers))
+        mq.max_workers = max(mq.max_workers, max(1, max_workers))
+        mq.ensure_workers()
+        fut: asyncio.Future = asyncio.get_running_loop().create_future()
+        await mq.queue.put((fn, fut))
+        return await fut
+
+
+# Instancia global (una por proceso/worker)
+batcher = Batcher()
@@ -1,12 +1,27 @@
 
+import functools
 import hashlib
 import os
+import queue
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
 
+try:
+    import blake3 as _blake3
+except ImportError:  # opcional: los fallbacks de hashlib cubren el resto
+    _blake3 = None
 
+
+@functools.cache
 def get_cache_dir() -> Path:
-    """Obtiene el directorio de cache configurado."""
+    """Obtiene el directorio de cache configurado (memoizado).
+
+    Sin memoizar, cada get_cache_path/save pagaba el import de settings y
+    un mkdir (stat) por llamada; la configuración no cambia en caliente.
+    """
     # Import aquí para evitar circular imports
     try:
         from ..config import settings
@@ -19,6 +34,7 @@ def get_cache_dir() -> Path:
     return cache_dir
 
 
+@functools.cache
 def is_cache_enabled() -> bool:
     """Verifica si el cache está habilitado."""
     try:
@@ -28,6 +44,7 @@ def is_cache_enabled() -> bool:
         return True  # Default habilitado
 
 
+@functools.cache
 def get_cache_max_size_bytes() -> int:
     """Obtiene el tamaño máximo del cache en bytes."""
     try:
@@ -38,67 +55,396 @@ def get_cache_max_size_bytes() -> int:
     except ImportError:
         return 1024 * 1024 * 1000  # 1GB default
 
+def reset_cache_config() -> None:
+    """Invalida los helpers de configuración memoizados (para tests)."""
+    get_cache_dir.cache_clear()
+    is_cache_enabled.cache_clear()
+    get_cache_max_size_bytes.cache_clear()
+
+# ---------------------------------------------------------------------------
+# L1: cache LRU en memoria delante del cache en disco. Un hit aquí evita
+# stat + open + read por request para las frases calientes. Sharded n-way
+# (lock por shard): los threads del pool no contienden en un lock global.
+
+_MEM_SHARDS = 16
+_MEM_CACHE: "list[OrderedDict[Tuple[str, str], bytes]]" = [
+    OrderedDict() for _ in range(_MEM_SHARDS)
+]
+_MEM_CACHE_BYTES = [0] * _MEM_SHARDS
+_MEM_CACHE_LOCKS = [threading.Lock() for _ in range(_MEM_SHARDS)]
+
+
+def get_mem_cache_max_bytes() -> int:
+    """Límite del cache L1: 1/8 del límite en disco (256MB si es ilimitado)."""
+    disk_max = get_cache_max_size_bytes()
+    if disk_max <= 0:
+        return 256 * 1024 * 1024
+    return disk_max // 8
+
+
+def mem_entry_max_bytes() -> int:
+    """Tamaño máximo de entrada que admite el L1 (presupuesto por shard).
+
+    Útil para que los llamadores decidan si vale la pena leer un archivo
+    entero solo para promocionarlo a memoria.
+    """
+    return get_mem_cache_max_bytes() // _MEM_SHARDS
+
+
+def _mem_shard(key: str) -> int:
+    # Las claves son hex de un hash: los dos primeros chars ya son uniformes
+    try:
+        return int(key[:2], 16) % _MEM_SHARDS
+    except ValueError:
+        return hash(key) % _MEM_SHARDS
+
+
+def mem_get(key: str, fmt: str) -> Optional[bytes]:
+    """Busca en el cache L1 en memoria (refresca la posición LRU)."""
+    i = _mem_shard(key)
+    with _MEM_CACHE_LOCKS[i]:
+        shard = _MEM_CACHE[i]
+        data = shard.get((key, fmt))
+        if data is not None:
+            shard.move_to_end((key, fmt))
+        return data
+
+
+def mem_put(key: str, fmt: str, data: bytes) -> None:
+    """Inserta en el L1, desalojando los menos usados si excede el límite."""
+    # Presupuesto por shard: el límite global repartido uniformemente
+    shard_max = mem_entry_max_bytes()
+    if not is_cache_enabled() or shard_max <= 0 or len(data) > shard_max:
+        return
+    i = _mem_shard(key)
+    with _MEM_CACHE_LOCKS[i]:
+        shard = _MEM_CACHE[i]
+        old = shard.pop((key, fmt), None)
+        if old is not None:
+            _MEM_CACHE_BYTES[i] -= len(old)
+        shard[(key, fmt)] = data
+        _MEM_CACHE_BYTES[i] += len(data)
+        while _MEM_CACHE_BYTES[i] > shard_max and shard:
+            _, evicted = shard.popitem(last=False)
+            _MEM_CACHE_BYTES[i] -= len(evicted)
+
+
+def mem_clear() -> None:
+    """Vacía el cache L1 (p. ej. tras clear_cache)."""
+    for i in range(_MEM_SHARDS):
+        with _MEM_CACHE_LOCKS[i]:
+            _MEM_CACHE[i].clear()
+            _MEM_CACHE_BYTES[i] = 0
+
+# ---------------------------------------------------------------------------
+
+
+def _sha_ni_available() -> bool:
+    """Detecta la extensión SHA-NI en x86 vía /proc/cpuinfo (Linux)."""
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("flags"):
+                    return "sha_ni" in line.split()
+    except OSError:
+        pass
+    return False
+
+
+# Hash de claves (no es un uso criptográfico adversarial): BLAKE3 si está
+# instalado (SIMD, varios GB/s); si no, SHA-256 solo cuando el CPU lo acelera
+# por hardware (SHA-NI) y blake2b en el resto (2-3x más rápido que SHA-256).
+if _blake3 is not None:
+    def _new_hasher():
+        return _blake3.blake3()
+elif _sha_ni_available():
+    def _new_hasher():
+        return hashlib.sha256()
+else:
+    def _new_hasher():
+        return hashlib.blake2b(digest_size=16)
+
+
+# Los builders hashean en dos updates (metadatos | texto) en vez de
+# materializar un f-string con el texto completo: para entradas largas eso
+# era una copia entera por clave. strip() es ~gratis si ya viene recortado.
+#
+# El prefijo de metadatos es invariante entre requests con la misma voz y
+# parámetros: su estado de hash se memoiza y cada clave parte de un copy()
+# O(1), sin reformatear ni re-hashear el prefijo.
+
+@functools.lru_cache(maxsize=256)
+def _prefix_state(*parts):
+    h = _new_hasher()
+    h.update("|".join(str(p) for p in parts).encode("utf-8"))
+    h.update(b"|")
+    return h  # solo para .copy(): nunca mutar el estado cacheado
+
+
 def make_key(txt: str, voice: str, sample_rate: int, fmt: str) -> str:
     """Clave legacy (sin provider)."""
-    base = f"{voice}|{sample_rate}|{fmt}|{txt.strip()}"
-    return hashlib.sha256(base.encode("utf-8")).hexdigest()
+    h = _prefix_state(voice, sample_rate, fmt).copy()
+    h.update(txt.strip().encode("utf-8"))
+    return h.hexdigest()
 
 def make_key_v2(txt: str, provider: str, model: str, voice: str, sample_rate: int, fmt: str) -> str:
-    base = f"v2|{provider}|{model}|{voice}|{sample_rate}|{fmt}|{txt.strip()}"
-    return hashlib.sha256(base.encode("utf-8")).hexdigest()
+    h = _prefix_state("v2", provider, model, voice, sample_rate, fmt).copy()
+    h.update(txt.strip().encode("utf-8"))
+    return h.hexdigest()
 
 def make_key_v3(txt: str, provider: str, model: str, voice: str, sample_rate: int, fmt: str,
                 speaking_rate: float|None, pitch_shift: float|None, energy: float|None) -> str:
-    base = f"v3|{provider}|{model}|{voice}|{sample_rate}|{fmt}|{speaking_rate}|{pitch_shift}|{energy}|{txt.strip()}"
-    return hashlib.sha256(base.encode("utf-8")).hexdigest()
+    """Clave v3 (incluye parámetros de prosodia).
+
+    Los campos de identidad (provider/model/voice/fmt) llegan internados
+    desde la capa API: valores repetidos son el mismo objeto str y el
+    lru_cache de _prefix_state resuelve el hit comparando por puntero.
+    """
+    h = _prefix_state(
+        "v3", provider, model, voice, sample_rate, fmt,
+        speaking_rate, pitch_shift, energy,
+    ).copy()
+    h.update(txt.strip().encode("utf-8"))
+    return h.hexdigest()
 
 def get_cache_path(key: str, fmt: str) -> Path:
-    """Obtiene el path completo para un archivo de cache."""
+    """Path sharded del archivo de cache (layout tipo git objects).
+
+    Dos niveles por prefijo hex de la clave: con cientos de miles de
+    entradas, un directorio plano degrada cada lookup del filesystem.
+    """
+    return get_cache_dir() / key[:2] / key[2:4] / f"{key}.{fmt}"
+
+
+def _legacy_flat_path(key: str, fmt: str) -> Path:
+    """Path del layout plano anterior (migración perezosa)."""
     return get_cache_dir() / f"{key}.{fmt}"
 
 
+def _migrate_legacy(key: str, fmt: str) -> Optional[Path]:
+    """Mueve una entrada del layout plano al sharded si existe allí."""
+    legacy = _legacy_flat_path(key, fmt)
+    if not legacy.exists():
+        return None
+    path = get_cache_path(key, fmt)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(legacy, path)
+        return path
+    except OSError:
+        return legacy  # no se pudo mover: servir desde el path viejo
+
+
 def exists(key: str, fmt: str) -> bool:
     """Verifica si existe un archivo en el cache."""
+    return path_if_exists(key, fmt) is not None
+
+
+def path_if_exists(key: str, fmt: str) -> Optional[Path]:
+    """Devuelve el path del archivo cacheado si existe (un solo stat), o None."""
     if not is_cache_enabled():
-        return False
-    return get_cache_path(key, fmt).exists()
+        return None
+    path = get_cache_path(key, fmt)
+    if path.exists():
+        _note_hit(path)
+        return path
+    return _migrate_legacy(key, fmt)
+
+
+def try_load(key: str, fmt: str) -> Optional[bytes]:
+    """Carga datos del cache con EAFP: un open directo en vez de stat + open.
+
+    Pasa primero por el L1 en memoria y lo puebla en hits de disco.
+    """
+    if not is_cache_enabled():
+        return None
+    data = mem_get(key, fmt)
+    if data is not None:
+        return data
+    path = get_cache_path(key, fmt)
+    try:
+        # buffering=0: para un read() único del archivo completo, el
+        # BufferedReader solo añade una copia intermedia de 8 KiB en 8 KiB
+        with open(path, "rb", buffering=0) as f:
+            data = f.read()
+        _note_hit(path)
+    except FileNotFoundError:
+        path = _migrate_legacy(key, fmt)
+        if path is None:
+            return None
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+    mem_put(key, fmt, data)
+    return data
 
 
 def load(key: str, fmt: str) -> bytes:
     """Carga datos desde el cache."""
     if not is_cache_enabled():
         raise RuntimeError("Cache is disabled")
-    return get_cache_path(key, fmt).read_bytes()
+    with open(get_cache_path(key, fmt), "rb", buffering=0) as f:
+        return f.read()
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    """Escritura atómica: tmp (sufijo pid/tid) + os.replace.
+
+    Un lector concurrente nunca ve un archivo a medio escribir, y dos
+    escritores del mismo key no se corrompen entre sí: cada uno escribe a
+    su tmp y el rename es atómico en el mismo filesystem.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.tmp.{os.getpid()}.{threading.get_ident()}")
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            try:
+                # Hint al kernel: audio escrito de una vez rara vez se relee
+                # pronto de disco (el L1 en memoria cubre lo caliente); no
+                # conviene desplazar page cache útil. Solo advisory.
+                os.posix_fadvise(f.fileno(), 0, len(data), os.POSIX_FADV_DONTNEED)
+            except (AttributeError, OSError):
+                pass
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+        raise
+
+
+# Frecuencia de acceso por entrada (hits, último acceso) para la política
+# de desalojo: LRU puro por atime desaloja voces populares en rachas de
+# accesos frío-caliente y las recarga al instante. Solo en memoria: las
+# entradas sin historial en este proceso puntúan por atime como antes.
+
+_ACCESS_STATS: "dict[str, Tuple[int, float]]" = {}
+_ACCESS_LOCK = threading.Lock()
+
+
+def _note_hit(path: Path) -> None:
+    p = str(path)
+    now = time.time()
+    with _ACCESS_LOCK:
+        hits, _ = _ACCESS_STATS.get(p, (0, now))
+        _ACCESS_STATS[p] = (hits + 1, now)
+
+
+# Contador de bytes en disco mantenido incrementalmente: sin él, cada
+# chequeo de límite recorría el árbol entero (O(N) stats por escritura).
+# Se inicializa con una única pasada perezosa y se ajusta en cada
+# write/unlink; al reiniciar el proceso se recalcula, así nunca deriva.
+
+_CACHE_BYTES: Optional[int] = None
+_CACHE_BYTES_LOCK = threading.Lock()
+
+
+def _current_cache_bytes() -> int:
+    global _CACHE_BYTES
+    if _CACHE_BYTES is None:
+        with _CACHE_BYTES_LOCK:
+            if _CACHE_BYTES is None:
+                _CACHE_BYTES = get_cache_size()
+    return _CACHE_BYTES
+
+
+def _adjust_cache_bytes(delta: int) -> None:
+    global _CACHE_BYTES
+    with _CACHE_BYTES_LOCK:
+        if _CACHE_BYTES is not None:
+            _CACHE_BYTES = max(0, _CACHE_BYTES + delta)
+
+
+# Escritor en background: save() encola y responde sin esperar al disco.
+# El chequeo de límite (que recorre el directorio entero) también sale del
+# hilo del request. Mientras la entrada viaja por la cola, el L1 en memoria
+# ya la sirve; un miss de disco en otra instancia solo re-sintetiza.
+
+_WRITE_Q: "queue.Queue[Tuple[Path, bytes]]" = queue.Queue()
+_WRITER_STARTED = False
+_WRITER_LOCK = threading.Lock()
+
+
+def _writer_loop() -> None:
+    while True:
+        path, data = _WRITE_Q.get()
+        try:
+            max_size = get_cache_max_size_bytes()
+            if max_size > 0 and _current_cache_bytes() + len(data) > max_size:
+                cleanup_cache(max_size // 2)  # Limpiar hasta la mitad del límite
+            try:
+                old_size = path.stat().st_size  # re-escritura del mismo key
+            except OSError:
+                old_size = 0
+            _write_atomic(path, data)
+            _adjust_cache_bytes(len(data) - old_size)
+        except OSError:
+            pass  # el cache es best-effort: un fallo de disco no tira nada
+        finally:
+            _WRITE_Q.task_done()
+
+
+def _ensure_writer() -> None:
+    global _WRITER_STARTED
+    if _WRITER_STARTED:
+        return
+    with _WRITER_LOCK:
+        if not _WRITER_STARTED:
+            threading.Thread(
+                target=_writer_loop, daemon=True, name="cache-writer"
+            ).start()
+            _WRITER_STARTED = True
+
+
+def flush_writes() -> None:
+    """Bloquea hasta vaciar la cola de escrituras pendientes (tests/shutdown)."""
+    _WRITE_Q.join()
 
 
 def save(key: str, fmt: str, data: bytes) -> Optional[Path]:
-    """Guarda datos en el cache."""
+    """Guarda datos en el cache (publica en L1 y encola la escritura a disco)."""
     if not is_cache_enabled():
         return None
-
-    # Verificar límite de tamaño si está configurado
-    max_size = get_cache_max_size_bytes()
-    if max_size > 0:
-        current_size = get_cache_size()
-        if current_size + len(data) > max_size:
-            # Limpiar cache si excede el límite
-            cleanup_cache(max_size // 2)  # Limpiar hasta la mitad del límite
-
     path = get_cache_path(key, fmt)
-    path.write_bytes(data)
+    mem_put(key, fmt, data)
+    _ensure_writer()
+    _WRITE_Q.put((path, data))
     return path
 
 
+def _scan_files(dir_path):
+    """Itera los DirEntry de archivo bajo ``dir_path`` (recursivo).
+
+    os.scandir devuelve el tipo de entrada desde el propio readdir y
+    cachea el stat: frente a rglob ahorra un Path por entrada y un
+    syscall extra de is_file()/stat() por archivo.
+    """
+    try:
+        with os.scandir(dir_path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        yield from _scan_files(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield entry
+                except OSError:
+                    continue
+    except OSError:
+        return
+
+
 def get_cache_size() -> int:
     """Obtiene el tamaño total del cache en bytes."""
-    cache_dir = get_cache_dir()
     total_size = 0
-    try:
-        for file_path in cache_dir.rglob('*'):
-            if file_path.is_file():
-                total_size += file_path.stat().st_size
-    except (OSError, PermissionError):
-        pass
+    for entry in _scan_files(get_cache_dir()):
+        try:
+            total_size += entry.stat().st_size
+        except OSError:
+            pass
     return total_size
 
 
@@ -116,14 +462,23 @@ def cleanup_cache(target_size: int) -> int:
     files_removed = 0
 
     try:
-        # Obtener todos los archivos con su tiempo de acceso
+        # Puntuar cada archivo por frecuencia con envejecimiento
+        # (hits / edad del último acceso): LRU puro por atime desalojaba
+        # entradas populares en cuanto pasaban una racha sin accesos.
+        # Sin historial en este proceso se degrada a la LRU clásica
+        # (equivale a hits=1 con last_access=atime).
+        now = time.time()
+        with _ACCESS_LOCK:
+            stats = dict(_ACCESS_STATS)
+
         files = []
-        for file_path in cache_dir.rglob('*'):
-            if file_path.is_file():
-                stat = file_path.stat()
-                files.append((file_path, stat.st_atime, stat.st_size))
+        for entry in _scan_files(cache_dir):
+            st = entry.stat()
+            hits, last = stats.get(entry.path, (1, st.st_atime))
+            score = hits / max(1.0, now - last)
+            files.append((entry.path, score, st.st_size))
 
-        # Ordenar por tiempo de acceso (más antiguos primero)
+        # Ordenar por puntuación (candidatos más fríos primero)
         files.sort(key=lambda x: x[1])
 
         current_size = sum(f[2] for f in files)
@@ -133,8 +488,11 @@ def cleanup_cache(target_size: int) -> int:
             if current_size <= target_size:
                 break
             try:
-                file_path.unlink()
+                os.unlink(file_path)
                 current_size -= file_size
+                _adjust_cache_bytes(-file_size)
+                with _ACCESS_LOCK:
+                    _ACCESS_STATS.pop(file_path, None)
                 files_removed += 1
             except (OSError, PermissionError):
                 pass
@@ -152,18 +510,21 @@ def clear_cache() -> int:
     Returns:
         Número de archivos eliminados
     """
+    flush_writes()  # no dejar escrituras en vuelo que "resuciten" entradas
     cache_dir = get_cache_dir()
     files_removed = 0
 
-    try:
-        for file_path in cache_dir.rglob('*'):
-            if file_path.is_file():
-                try:
-                    file_path.unlink()
-                    files_removed += 1
-                except (OSError, PermissionError):
-                    pass
-    except (OSError, PermissionError):
-        pass
-
+    for entry in _scan_files(cache_dir):
+        try:
+            os.unlink(entry.path)
+            files_removed += 1
+        except (OSError, PermissionError):
+            pass
+
+    global _CACHE_BYTES
+    with _CACHE_BYTES_LOCK:
+        _CACHE_BYTES = 0
+    with _ACCESS_LOCK:
+        _ACCESS_STATS.clear()
+    mem_clear()
     return files_removed
\ No newline at end of file
@@ -45,6 +45,14 @@ class DependencyManager:
             alternative_names=["coqui_tts", "TTS"],
         ),
 
+        "piper_tts": DependencyInfo(
+            name="piper_tts",
+            package="piper",
+            level=DependencyLevel.OPTIONAL,
+            description="API Python de Piper para síntesis in-process (sin subprocess)",
+            install_command="pip install piper-tts",
+        ),
+
         # Audio processing
         "torch": DependencyInfo(
             name="torch",
@@ -53,6 +61,13 @@ class DependencyManager:
             description="PyTorch para GPU support en Coqui TTS",
             install_command="pip install torch",
         ),
+        "torchaudio": DependencyInfo(
+            name="torchaudio",
+            package="torchaudio",
+            level=DependencyLevel.OPTIONAL,
+            description="torchaudio para resampling en GPU junto a Coqui",
+            install_command="pip install torchaudio",
+        ),
         "librosa": DependencyInfo(
             name="librosa",
             package="librosa",
@@ -60,6 +75,13 @@ class DependencyManager:
             description="Librosa para resampling y manipulación de audio",
             install_command="pip install librosa",
         ),
+        "soxr": DependencyInfo(
+            name="soxr",
+            package="soxr",
+            level=DependencyLevel.OPTIONAL,
+            description="Resampler libsoxr (C/SIMD), mucho más rápido que librosa",
+            install_command="pip install soxr",
+        ),
         "soundfile": DependencyInfo(
             name="soundfile",
             package="soundfile",
@@ -86,6 +108,20 @@ class DependencyManager:
         ),
 
         # Audio conversion
+        "pyrubberband": DependencyInfo(
+            name="pyrubberband",
+            package="pyrubberband",
+            level=DependencyLevel.OPTIONAL,
+            description="Bindings de Rubber Band (C++/SIMD) para pitch/stretch",
+            install_command="pip install pyrubberband",
+        ),
+        "lameenc": DependencyInfo(
+            name="lameenc",
+            package="lameenc",
+            level=DependencyLevel.OPTIONAL,
+            description="Encoder LAME in-process para salida MP3 sin ffmpeg",
+            install_command="pip install lameenc",
+        ),
         "pydub": DependencyInfo(
             name="pydub",
             package="pydub",
@@ -142,6 +178,11 @@ class DependencyManager:
 
     def _try_import(self, package_name: str) -> Tuple[Optional[Any], Optional[str]]:
         """Intenta importar un paquete y retorna el módulo o error."""
+        # Fast-path: si ya está importado, evita que import_module tome el
+        # import lock (contiende entre threads en frío de self._cache)
+        module = sys.modules.get(package_name)
+        if module is not None:
+            return module, None
         try:
             module = importlib.import_module(package_name)
             return module, None
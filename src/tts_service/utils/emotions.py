@@ -1,6 +1,13 @@
 import json
+from functools import lru_cache
 from typing import Dict, Optional, Tuple
 
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # fallback a stdlib
+    _loads = json.loads
+
 DEFAULT_EMOTIONS: Dict[str, Tuple[float, float, float]] = {
     # emotion: (speaking_rate, pitch_shift, energy)
     "neutral": (1.0, 0.0, 1.0),
@@ -11,12 +18,15 @@ DEFAULT_EMOTIONS: Dict[str, Tuple[float, float, float]] = {
 }
 
 
+@lru_cache(maxsize=8)
 def load_custom_emotions(raw: str) -> Dict[str, Tuple[float, float, float]]:
+    """Parsea emociones custom (JSON u CSV). Memoizado por string crudo:
+    la configuración no cambia en caliente, así que se parsea una vez."""
     if not raw.strip():
         return {}
     if raw.strip().startswith('{'):
         try:
-            data = json.loads(raw)
+            data = _loads(raw)
             out: Dict[str, Tuple[float, float, float]] = {}
             for k, v in data.items():
                 if isinstance(v, (list, tuple)) and len(v) == 3:
@@ -41,6 +51,17 @@ def load_custom_emotions(raw: str) -> Dict[str, Tuple[float, float, float]]:
     return out
 
 
+def build_emotion_map(custom: Dict[str, Tuple[float, float, float]]) -> Dict[str, Tuple[float, float, float]]:
+    """Mapa único defaults+custom con las claves ya en minúsculas.
+
+    Construido una vez por carga de config: resolver una emoción queda en
+    un solo dict.get en vez de dos lookups más el branch por llamada.
+    """
+    merged = {k.lower(): v for k, v in DEFAULT_EMOTIONS.items()}
+    merged.update((k.lower(), v) for k, v in custom.items())
+    return merged
+
+
 def resolve_emotion(emotion: Optional[str], custom: Dict[str, Tuple[float, float, float]]):
     if not emotion:
         return None
@@ -5,10 +5,18 @@ Proporciona configuración centralizada y loggers específicos por módulo.
 
 import logging
 import logging.config
-import sys
+import logging.handlers  # pre-importado: dictConfig lo resuelve sin importar en caliente
 from pathlib import Path
 from typing import Optional, Dict, Any
-import json
+
+try:
+    # Calienta sys.modules para el formatter JSON referenciado por string
+    # en dictConfig; así el primer log tras el arranque no paga el import
+    from pythonjsonlogger import jsonlogger as _jsonlogger  # noqa: F401
+except ImportError:  # pragma: no cover
+    _jsonlogger = None
+
+_CONFIGURED = False
 
 
 class TTSFormatter(logging.Formatter):
@@ -44,7 +52,13 @@ def setup_logging(
         enable_structured: Si usar logging estructurado con JSON
         max_bytes: Tamaño máximo del archivo antes de rotación
         backup_count: Número de archivos de backup a mantener
+
+    Idempotente: re-ejecutar dictConfig duplicaría handlers, así que las
+    llamadas posteriores a la primera no hacen nada.
     """
+    global _CONFIGURED
+    if _CONFIGURED:
+        return
 
     # Configuración base
     config: Dict[str, Any] = {
@@ -131,6 +145,7 @@ def setup_logging(
 
     # Aplicar configuración
     logging.config.dictConfig(config)
+    _CONFIGURED = True
 
 
 def get_logger(name: str) -> logging.Logger:
@@ -156,9 +171,11 @@ def log_engine_operation(logger: logging.Logger, engine: str, operation: str, **
         operation: Operación realizada
         **kwargs: Información adicional (voice_id, duration, etc.)
     """
-    extra = {"engine": engine}
-    extra.update(kwargs)
-    logger.info(f"{operation}", extra=extra)
+    # Gate temprano: en el hot path no se construye el dict de extra si
+    # INFO está deshabilitado
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    logger.info("%s", operation, extra={"engine": engine, **kwargs})
 
 
 def log_api_request(logger: logging.Logger, endpoint: str, request_id: str, **kwargs) -> None:
@@ -171,9 +188,9 @@ def log_api_request(logger: logging.Logger, endpoint: str, request_id: str, **kw
         request_id: ID único de la request
         **kwargs: Información adicional
     """
-    extra = {"request_id": request_id}
-    extra.update(kwargs)
-    logger.info(f"API request to {endpoint}", extra=extra)
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    logger.info("API request to %s", endpoint, extra={"request_id": request_id, **kwargs})
 
 
 def log_error_with_context(logger: logging.Logger, error: Exception, context: Dict[str, Any]) -> None:
@@ -186,7 +203,7 @@ def log_error_with_context(logger: logging.Logger, error: Exception, context: Di
         context: Contexto adicional del error
     """
     logger.error(
-        f"Error: {type(error).__name__}: {str(error)}",
+        "Error: %s: %s", type(error).__name__, error,
         extra=context,
         exc_info=True
     )
\ No newline at end of file
@@ -1,19 +1,30 @@
 import re
+from functools import lru_cache
 from typing import Callable
 from num2words import num2words
 
+# Compilado una vez al importar: el scan corre en C, no en bytecode Python
 _number_re = re.compile(r"(?<![\w\d])(\d+)(?![\w\d])")
+# Guard barato para el caso común sin dígitos (scan C, sin bucle Python)
+_digit_search = re.compile(r"\d").search
 
 
-def normalize_numbers_es(text: str, converter: Callable[[int], str] | None = None) -> str:
-    """Convierte números enteros aislados a palabras en español.
-    123 -> ciento veintitrés.
-    Mantiene formato original para números muy grandes > 10**12.
+@lru_cache(maxsize=4096)
+def _n2w_es(n: int) -> str:
+    """num2words memoizado, ya con el post-proceso de guiones aplicado.
+
+    Los mismos números ("1", "2", años, fechas) se repiten entre textos
+    distintos; num2words asigna mucho por llamada y esto lo reduce a un
+    lookup para repeticiones.
     """
-    if not text or not any(ch.isdigit() for ch in text):
-        return text
-    conv = converter or (lambda n: num2words(n, lang='es'))
+    return num2words(n, lang='es').replace('-', ' ')
 
+
+# Los 0-99 cubren la gran mayoría de apariciones: precalculados al importar
+_SMALL_TABLE = tuple(_n2w_es(i) for i in range(100))
+
+
+def _normalize(text: str, conv: Callable[[int], str]) -> str:
     def _rep(m: re.Match) -> str:
         raw = m.group(1)
         try:
@@ -28,3 +39,40 @@ def normalize_numbers_es(text: str, converter: Callable[[int], str] | None = Non
         except Exception:
             return raw
     return _number_re.sub(_rep, text)
+
+
+def _rep_default(m: re.Match) -> str:
+    raw = m.group(1)
+    try:
+        # int() rechaza cadenas de más de ~4300 dígitos (límite CPython)
+        n = int(raw)
+    except ValueError:
+        return raw
+    if n < 100:
+        return _SMALL_TABLE[n]
+    if n > 10**12:  # evita textos gigantescos
+        return raw
+    try:
+        return _n2w_es(n)
+    except Exception:
+        return raw
+
+
+@lru_cache(maxsize=4096)
+def _normalize_default(text: str) -> str:
+    return _number_re.sub(_rep_default, text)
+
+
+def normalize_numbers_es(text: str, converter: Callable[[int], str] | None = None) -> str:
+    """Convierte números enteros aislados a palabras en español.
+    123 -> ciento veintitrés.
+    Mantiene formato original para números muy grandes > 10**12.
+
+    Con el converter por defecto el resultado se memoiza (los mismos textos
+    se repiten entre requests de síntesis idénticas).
+    """
+    if not text or _digit_search(text) is None:
+        return text
+    if converter is None:
+        return _normalize_default(text)
+    return _normalize(text, converter)
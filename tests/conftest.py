@@ -0,0 +1,37 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+
+# La suite no depende de la config de despliegue (models/tts_config.json es
+# local a cada instalación y no se versiona): genera una config unificada
+# efímera apuntando al modelo piper que sí viene en el repo, y aísla el
+# cache en un directorio temporal para no ensuciar el árbol de trabajo.
+# Debe ejecutarse antes de importar src.tts_service.config (pytest importa
+# conftest.py antes que los módulos de test).
+
+_ROOT = Path(__file__).resolve().parents[1]
+_TMP = Path(tempfile.mkdtemp(prefix="tts-service-tests-"))
+
+os.environ.setdefault("API_KEY", "test")
+os.environ["CACHE_DIR"] = str(_TMP / "cache")
+
+_CONFIG = {
+    "voices": [
+        {
+            "id": "piper-es-ES-mls-medium",
+            "provider": "piper",
+            "lang": "es-ES",
+            "name": "Piper Spanish MLS medium",
+            "model": str(_ROOT / "models" / "piper" / "es-ES" / "es_ES-mls-medium.onnx"),
+            "config": str(_ROOT / "models" / "piper" / "es-ES" / "es_ES-mls-medium.onnx.json"),
+            "sample_rate": 22050,
+        }
+    ],
+    "defaults": {"sample_rate": 22050, "enable_prosody": True},
+}
+
+_cfg_file = _TMP / "tts_config.json"
+_cfg_file.write_text(json.dumps(_CONFIG), encoding="utf-8")
+# Path absoluto: get_unified_config_path() lo respeta tal cual
+os.environ["UNIFIED_CONFIG_FILE"] = str(_cfg_file)
@@ -62,6 +62,24 @@ def test_synthesize_with_prosody_rate():
     assert r.headers["content-type"].startswith("audio/wav")
     assert r.content[:4] == b"RIFF"
 
+def test_synthesize_stream_matches_cached_replay():
+    # El primer request (sin cache) sale por el camino de streaming; el
+    # segundo se sirve del cache y debe devolver bytes idénticos
+    payload = {
+        "text": "La respuesta en streaming coincide con la cacheada",
+        "voice": "piper-es-ES-mls-medium",
+        "format": "wav"
+    }
+    r1 = client.post("/synthesize", json=payload, headers={"X-API-Key": settings.API_KEY})
+    r2 = client.post("/synthesize", json=payload, headers={"X-API-Key": settings.API_KEY})
+    assert r1.status_code == 200 and r2.status_code == 200
+    assert r1.content[:4] == b"RIFF"
+    # Mismo audio; el replay cacheado lleva los tamaños RIFF reales en vez
+    # de los placeholders del header de streaming
+    assert r1.content[44:] == r2.content[44:]
+    with wave.open(io.BytesIO(r2.content), "rb") as wf:
+        assert wf.getnframes() == (len(r2.content) - 44) // 2
+
 def test_synthesize_with_emotion():
     payload = {
         "text": "Hola esto es una prueba emocionada",
@@ -0,0 +1,20 @@
+import asyncio
+
+import pytest
+
+from src.tts_service.utils.batcher import Batcher
+
+
+def test_batcher_propagates_errors_and_recovers():
+    async def main():
+        bat = Batcher()
+
+        def boom():
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError, match="boom"):
+            await bat.submit("test:model", boom)
+        # La cola sigue usable tras un error: el siguiente submit resuelve
+        assert await bat.submit("test:model", lambda: b"ok") == b"ok"
+
+    asyncio.run(main())
@@ -0,0 +1,55 @@
+import pytest
+
+from src.tts_service.config import settings
+from src.tts_service.utils import cache
+
+
+@pytest.fixture
+def tmp_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_DIR", str(tmp_path))
+    cache.reset_cache_config()
+    cache.mem_clear()
+    yield tmp_path
+    cache.flush_writes()
+    cache.reset_cache_config()
+    cache.mem_clear()
+
+
+def test_sharded_layout(tmp_cache):
+    key = cache.make_key_v2("hola", "piper", "m", "v", 22050, "wav")
+    path = cache.get_cache_path(key, "wav")
+    assert path.parent.parent.parent == tmp_cache
+    assert path.parent.parent.name == key[:2]
+    assert path.parent.name == key[2:4]
+    assert path.name == f"{key}.wav"
+
+
+def test_save_flush_and_hit(tmp_cache):
+    key = cache.make_key_v2("texto", "piper", "m", "v", 22050, "wav")
+    cache.save(key, "wav", b"RIFFxxxx")
+    # El L1 sirve la entrada aunque la escritura a disco siga en cola
+    assert cache.mem_get(key, "wav") == b"RIFFxxxx"
+    cache.flush_writes()
+    path = cache.path_if_exists(key, "wav")
+    assert path is not None
+    assert path.read_bytes() == b"RIFFxxxx"
+
+
+def test_legacy_flat_migration(tmp_cache):
+    key = cache.make_key("texto legacy", "v", 22050, "wav")
+    legacy = tmp_cache / f"{key}.wav"
+    legacy.write_bytes(b"RIFFlegacy")
+    path = cache.path_if_exists(key, "wav")
+    assert path == cache.get_cache_path(key, "wav")
+    assert path.read_bytes() == b"RIFFlegacy"
+    assert not legacy.exists()
+
+
+def test_disk_hit_promotes_to_l1(tmp_cache):
+    key = cache.make_key_v2("promo", "piper", "m", "v", 22050, "wav")
+    cache.save(key, "wav", b"RIFFpromo")
+    cache.flush_writes()
+    cache.mem_clear()  # simula un reinicio con el L1 frío
+    assert cache.mem_get(key, "wav") is None
+    assert cache.try_load(key, "wav") == b"RIFFpromo"
+    assert cache.mem_get(key, "wav") == b"RIFFpromo"